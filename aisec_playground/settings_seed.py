@@ -0,0 +1,15 @@
+"""
+辅助脚本（create_superuser.py / create_dummy_data.py）专用的精简配置。
+
+这些脚本只读写 auth / learning / playground 的模型，不需要 admin、channels、daphne
+等 app；只加载必要的 app 可以明显缩短 django.setup() 的冷启动时间。
+数据库等其余配置与主配置完全一致。
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'learning',
+    'playground',
+]
@@ -2,7 +2,7 @@ import os
 import django
 from django.contrib.auth import get_user_model
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aisec_playground.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aisec_playground.settings_seed')
 django.setup()
 
 User = get_user_model()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LearningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning'
+
+    def ready(self):
+        from . import signals  # noqa: F401  注册侧栏缓存失效的信号处理
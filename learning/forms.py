@@ -18,13 +18,15 @@ class TopicForm(forms.ModelForm):
 
     def clean(self):
         cleaned = super().clean()
-        content = (cleaned.get("content") or "").strip()
+        content = cleaned.get("content") or ""
+        # isspace() 遇到第一个非空白字符即返回，避免 strip() 复制整段大文本
+        has_content = bool(content) and not content.isspace()
         md = cleaned.get("markdown_file")
 
         # 允许两种方式之一：
         # - 直接填写 content
         # - 上传 markdown_file（内容由 view 读取覆盖）
-        if not content and not md:
+        if not has_content and not md:
             self.add_error("content", "请填写内容，或上传一个 Markdown 文件。")
 
         return cleaned
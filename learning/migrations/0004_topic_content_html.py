@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_topic_author_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='渲染后的 HTML'),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='toc_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='渲染后的目录'),
+        ),
+    ]
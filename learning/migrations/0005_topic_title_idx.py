@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_topic_content_html'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['title'], name='topic_title_idx'),
+        ),
+    ]
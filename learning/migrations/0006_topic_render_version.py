@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0005_topic_title_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='渲染版本'),
+        ),
+    ]
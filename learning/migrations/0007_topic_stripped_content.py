@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0006_topic_render_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='stripped_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='纯文本内容'),
+        ),
+    ]
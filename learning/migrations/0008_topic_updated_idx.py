@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0007_topic_stripped_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-updated_at'], name='topic_updated_idx'),
+        ),
+    ]
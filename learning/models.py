@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .rendering import RENDER_VERSION, render_markdown, strip_markdown
+
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name="分类名称")
     description = models.TextField(blank=True, verbose_name="描述")
@@ -27,12 +29,63 @@ class Topic(models.Model):
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="作者")
     author_name = models.CharField(max_length=100, blank=True, verbose_name="作者姓名（可自填）")
     content = models.TextField(verbose_name="内容")
+    # 渲染缓存：content 变化时在 save() 中重新生成，详情页/搜索直接使用
+    content_html = models.TextField(blank=True, editable=False, verbose_name="渲染后的 HTML")
+    toc_html = models.TextField(blank=True, editable=False, verbose_name="渲染后的目录")
+    stripped_content = models.TextField(blank=True, editable=False, verbose_name="纯文本内容")
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="渲染版本")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 记录加载时的 content，用于判断保存时是否需要重新渲染；
+        # 用 __dict__ 读取，避免 content 被 defer 时触发额外查询
+        self._loaded_content = self.__dict__.get('content')
+
     def __str__(self):
         return self.title
 
+    def _render_is_stale(self) -> bool:
+        if 'content' in self.get_deferred_fields():
+            return self.render_version != RENDER_VERSION
+        return (
+            self.render_version != RENDER_VERSION
+            or self.content != self._loaded_content
+            or (bool(self.content) and not self.content_html)
+        )
+
+    def _render(self) -> None:
+        self.content_html, self.toc_html = render_markdown(self.content)
+        self.stripped_content = strip_markdown(self.content)
+        self.render_version = RENDER_VERSION
+
+    def ensure_rendered(self) -> None:
+        """
+        渲染缓存过期（迁移前的老数据、bulk_create 写入、渲染流程升级）时补渲染，
+        用 update() 回写，避免刷新 updated_at。
+        """
+        if not self._render_is_stale():
+            return
+        self._render()
+        type(self).objects.filter(pk=self.pk).update(
+            content_html=self.content_html,
+            toc_html=self.toc_html,
+            stripped_content=self.stripped_content,
+            render_version=self.render_version,
+        )
+
+    def save(self, *args, **kwargs):
+        if self._render_is_stale():
+            self._render()
+        super().save(*args, **kwargs)
+        self._loaded_content = self.content
+
     class Meta:
         verbose_name = "知识点"
         verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['title'], name='topic_title_idx'),
+            # 首页/详情页“最近更新”、搜索结果都按 updated_at 倒序取前 N 条
+            models.Index(fields=['-updated_at'], name='topic_updated_idx'),
+        ]
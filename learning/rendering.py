@@ -0,0 +1,123 @@
+"""
+知识点 Markdown 渲染
+
+topic_detail 与 Topic.save() 共用同一套渲染流程，渲染结果缓存在 Topic 上，
+页面浏览时无需再跑 Markdown；搜索摘要用的纯文本也一并缓存。
+代码高亮不在服务端做（不启用 codehilite），由 base.html 中的 highlight.js
+在浏览器里处理 fenced_code 生成的 <pre><code class="language-xxx">。
+"""
+import re
+import threading
+from typing import Tuple
+
+import markdown as mdlib
+
+# 渲染流程（扩展、配置、预处理）变化时加 1，已缓存的 HTML 会在下次访问时重新渲染
+# 2: 新增 stripped_content；3: 链接里嵌套的 URL 不再被包成 <...>
+RENDER_VERSION = 3
+
+# 额外启用 sane_lists，让“有缩进/混合段落”的列表更稳定。
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'toc', 'sane_lists', 'smarty']
+MARKDOWN_EXTENSION_CONFIGS = {
+    'toc': {
+        'permalink': True,
+        'permalink_title': '复制链接',
+    }
+}
+
+
+# 裸 URL 候选；前后文是否需要排除在 _preprocess_markdown 里逐个判断，
+# 不用变长的负向前瞻，避免每个 URL 都把后文重扫一遍（URL 多时是平方级回溯）
+_URL_RE = re.compile(r"(https?://)[^\s>\)\]]+")
+
+
+def _preprocess_markdown(text: str) -> str:
+    """
+    轻量预处理：
+    - 将裸 URL 包一层 <...>，让 Markdown 自动生成可点击链接。
+      例如：链接：https://example.com -> 链接：<https://example.com>
+    - 排除已经在 Markdown 链接/图片语法中的 URL：[text](url) 或 ![alt](url)
+    - 排除紧跟在 < 或 ( 后面的，以及位于 [...] 里面的（后文先遇到 ] 而不是 [）
+    """
+    if not text:
+        return ""
+    parts = []
+    last = 0
+    # 后文中下一个 [ / ] 的位置，URL 是从左到右出现的，只在越过缓存位置时才重新查找
+    next_open = next_close = -1
+    for m in _URL_RE.finditer(text):
+        start, end = m.span()
+        if start and text[start - 1] in '<(':
+            continue
+        if next_open != -1 and next_open < end:
+            next_open = -1
+        if next_close != -1 and next_close < end:
+            next_close = -1
+        if next_open == -1:
+            next_open = text.find('[', end)
+            next_open = len(text) if next_open == -1 else next_open
+        if next_close == -1:
+            next_close = text.find(']', end)
+            next_close = len(text) if next_close == -1 else next_close
+        if next_close < next_open:
+            # 在 [...] 里：URL 本身含 [ 时，截到最后一个 [ 之前（与原先正则回溯的结果一致）
+            end = text.rfind('[', m.end(1) + 1, end)
+            if end == -1:
+                continue
+        parts.append(text[last:start])
+        parts.append(f"<{text[start:end]}>")
+        last = end
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+# Markdown 实例构造（注册扩展、解析配置）开销较大，每个线程复用一个，渲染前 reset()；
+# 实例本身不是线程安全的，所以不能全局共享一个
+_local = threading.local()
+
+
+def _get_markdown() -> mdlib.Markdown:
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = mdlib.Markdown(
+            extensions=MARKDOWN_EXTENSIONS,
+            extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+        )
+        _local.md = md
+    return md
+
+
+def render_markdown(text: str) -> Tuple[str, str]:
+    """渲染 Markdown + 生成 TOC（标题目录 & 自动锚点），返回 (html, toc_html)。"""
+    md = _get_markdown()
+    md.reset()
+    html = md.convert(_preprocess_markdown(text or ""))
+    return html, (md.toc or "")
+
+
+# 搜索摘要用的 Markdown 清理正则，模块加载时编译一次
+_CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```")
+_INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]+\)")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+_MD_SYMBOL_RE = re.compile(r"[*_~#>]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def strip_markdown(text: str) -> str:
+    """非常轻量的 Markdown 清理，用于搜索摘要展示（不追求完全准确）。"""
+    if not text:
+        return ""
+    # 去掉代码块/行内代码的反引号
+    text = _CODE_BLOCK_RE.sub(" ", text)
+    text = _INLINE_CODE_RE.sub(r"\1", text)
+    # 链接/图片: ![alt](url) / [text](url)
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    # 标题/加粗/斜体等符号
+    text = _MD_SYMBOL_RE.sub(" ", text)
+    # 多空白压缩
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text
@@ -0,0 +1,28 @@
+"""
+分类 / 文章变更时让侧栏缓存失效。
+
+侧栏（分类 + 文章树）缓存的 key 带一个版本号，任何 Category / Topic 的保存或删除
+都会换一个新版本号，旧缓存自然不再命中（随超时过期）。
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Topic
+
+SIDEBAR_VERSION_KEY = 'learning:sidebar:version'
+
+
+def sidebar_version() -> int:
+    """当前侧栏缓存版本号；缓存被清空后会生成新的版本号，不会撞上旧数据。"""
+    return cache.get_or_set(SIDEBAR_VERSION_KEY, time.time_ns, None)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def bump_sidebar_version(**kwargs) -> None:
+    cache.set(SIDEBAR_VERSION_KEY, time.time_ns(), None)
@@ -1,25 +1,39 @@
 import re
+import threading
+
 import markdown
 from django import template
 from django.utils.safestring import mark_safe
 
 register = template.Library()
 
+# 裸 URL 自动加 <...>，模块加载时编译一次
+_AUTOLINK_RE = re.compile(r"(?<!<)(https?://[^\s>]+)")
+
+# Markdown 实例构造（注册扩展）开销较大，每个线程复用一个，渲染前 reset()；
+# 实例本身不是线程安全的，所以不能全局共享一个
+_local = threading.local()
+
+
+def _get_markdown() -> markdown.Markdown:
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = markdown.Markdown(
+            extensions=['fenced_code', 'tables', 'sane_lists', 'smarty'],
+        )
+        _local.md = md
+    return md
+
 
 def _preprocess_markdown(text: str) -> str:
     if not text:
         return ""
-    return re.sub(r"(?<!<)(https?://[^\s>]+)", r"<\1>", text)
+    return _AUTOLINK_RE.sub(r"<\1>", text)
 
 
 @register.filter(name='markdown')
 def markdown_format(text):
-    return mark_safe(
-        markdown.markdown(
-            _preprocess_markdown(text),
-            extensions=['fenced_code', 'codehilite', 'tables', 'sane_lists', 'smarty'],
-        )
-    )
+    return mark_safe(_get_markdown().reset().convert(_preprocess_markdown(text)))
 
 
 @register.filter(name='get_item')
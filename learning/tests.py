@@ -1,3 +1,322 @@
-from django.test import TestCase
+"""
+学习区基础测试
 
-# Create your tests here.
+运行: python manage.py test learning
+"""
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .forms import TopicForm
+from .models import Category, Topic
+from .rendering import _preprocess_markdown, render_markdown
+from .views import _read_markdown_upload
+
+
+class TopicRenderCacheTest(TestCase):
+    """测试 Topic 渲染结果缓存"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='测试分类')
+
+    def test_save_renders_html_and_toc(self):
+        topic = Topic.objects.create(category=self.category, title='t', content='# 标题\n\n正文 https://example.com')
+        self.assertIn('<h1 id=', topic.content_html)
+        self.assertIn('href="https://example.com"', topic.content_html)
+        self.assertIn('标题', topic.toc_html)
+
+    def test_save_rerenders_after_content_change(self):
+        topic = Topic.objects.create(category=self.category, title='t', content='旧内容')
+        topic.content = '新内容'
+        topic.save()
+        topic.refresh_from_db()
+        self.assertIn('新内容', topic.content_html)
+        self.assertNotIn('旧内容', topic.content_html)
+
+    def test_detail_backfills_missing_cache(self):
+        # bulk_create 不走 save()，模拟迁移前的老数据
+        Topic.objects.bulk_create([Topic(category=self.category, title='t', content='**粗体**')])
+        topic = Topic.objects.get()
+        self.assertEqual(topic.content_html, '')
+
+        resp = Client().get(reverse('learning:topic_detail', args=[topic.id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('<strong>粗体</strong>', resp.context['rendered_content'])
+        topic.refresh_from_db()
+        self.assertIn('<strong>粗体</strong>', topic.content_html)
+
+    def test_save_without_content_change_skips_render(self):
+        topic = Topic.objects.create(category=self.category, title='t', content='正文')
+        topic = Topic.objects.get(pk=topic.pk)
+        topic.title = '新标题'
+        with patch('learning.models.render_markdown') as mock_render:
+            topic.save()
+        mock_render.assert_not_called()
+
+    def test_stale_render_version_rerendered_on_view(self):
+        topic = Topic.objects.create(category=self.category, title='t', content='正文')
+        Topic.objects.filter(pk=topic.pk).update(content_html='<p>旧缓存</p>', render_version=0)
+        updated_at = Topic.objects.get(pk=topic.pk).updated_at
+
+        resp = Client().get(reverse('learning:topic_detail', args=[topic.id]))
+        self.assertIn('正文', resp.context['rendered_content'])
+        topic.refresh_from_db()
+        self.assertNotIn('旧缓存', topic.content_html)
+        self.assertEqual(topic.updated_at, updated_at)
+
+    def test_fenced_code_left_for_client_highlighting(self):
+        topic = Topic.objects.create(category=self.category, title='t', content='```python\nprint(1)\n```')
+        self.assertIn('<code class="language-python">', topic.content_html)
+        self.assertNotIn('codehilite', topic.content_html)
+
+
+class TopicNeighborTest(TestCase):
+    """测试文章详情页的上一篇/下一篇"""
+
+    def test_prev_next_within_category(self):
+        cat = Category.objects.create(name='分类')
+        other = Category.objects.create(name='其他')
+        first = Topic.objects.create(category=cat, title='一', content='正文')
+        Topic.objects.create(category=other, title='插队', content='正文')
+        second = Topic.objects.create(category=cat, title='二', content='正文')
+        third = Topic.objects.create(category=cat, title='三', content='正文')
+
+        ctx = Client().get(reverse('learning:topic_detail', args=[second.id])).context
+        self.assertEqual(ctx['prev_topic'], {'id': first.id, 'title': '一'})
+        self.assertEqual(ctx['next_topic'], {'id': third.id, 'title': '三'})
+
+        ctx = Client().get(reverse('learning:topic_detail', args=[first.id])).context
+        self.assertIsNone(ctx['prev_topic'])
+        self.assertEqual(ctx['next_topic']['id'], second.id)
+
+        # 一条查询，窗口在子查询里算完只取当前这篇
+        from .views import _neighbor_topics
+
+        with self.assertNumQueries(1):
+            self.assertEqual(_neighbor_topics(third), ({'id': second.id, 'title': '二'}, None))
+
+
+class TopicFormTest(TestCase):
+    """测试 TopicForm 内容校验"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='测试分类')
+
+    def _form(self, content):
+        return TopicForm(data={'title': 't', 'category': self.category.id, 'level': 1, 'content': content})
+
+    def test_blank_content_rejected(self):
+        for content in ('', '   \n\t'):
+            form = self._form(content)
+            self.assertFalse(form.is_valid())
+            self.assertIn('content', form.errors)
+
+    def test_non_blank_content_accepted(self):
+        self.assertTrue(self._form('  正文').is_valid())
+
+
+class SearchTest(TestCase):
+    """测试搜索与摘要高亮"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='提示词攻击')
+        cls.topic = Topic.objects.create(
+            category=cls.category,
+            title='越狱',
+            content='# 标题\n\n一段 **Prompt** 注入示例，见 [链接](https://example.com)。\n\n```\ncode\n```',
+        )
+
+    def test_search_highlights_match(self):
+        resp = Client().get(reverse('learning:search'), {'q': 'prompt'})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.context['results']
+        self.assertEqual([r['obj'].id for r in results], [self.topic.id])
+        snippet = results[0]['snippet']
+        self.assertIn('<mark>Prompt</mark>', snippet)
+        self.assertNotIn('**', snippet)
+        self.assertNotIn('https://example.com', snippet)
+
+    def test_snippet_from_cached_plain_text(self):
+        self.topic.refresh_from_db()
+        self.assertTrue(self.topic.stripped_content.startswith('标题 一段 Prompt 注入示例'))
+        # bulk_create 写入的文章没有纯文本缓存，搜索时补上
+        Topic.objects.bulk_create([Topic(category=self.category, title='老数据', content='**老** prompt')])
+        resp = Client().get(reverse('learning:search'), {'q': '老'})
+        self.assertIn('<mark>老</mark> prompt', resp.context['results'][0]['snippet'])
+        self.assertEqual(Topic.objects.get(title='老数据').stripped_content, '老 prompt')
+
+    def test_highlight_query_with_html_chars(self):
+        Topic.objects.create(category=self.category, title='转义', content='比较 a<b 的写法')
+        resp = Client().get(reverse('learning:search'), {'q': 'a<b'})
+        self.assertIn('<mark>a&lt;b</mark>', resp.context['results'][0]['snippet'])
+
+    def test_empty_query_returns_nothing(self):
+        resp = Client().get(reverse('learning:search'), {'q': '  '})
+        self.assertEqual(resp.context['results'], [])
+
+
+class KnowledgePanelTest(TestCase):
+    """测试知识面板 / 思维导图"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='panel', password='testpass123')
+        for i in range(3):
+            cat = Category.objects.create(name=f'分类{i}')
+            for j in range(3):
+                Topic.objects.create(category=cat, title=f'文章{i}-{j}', content='正文')
+
+    def setUp(self):
+        # 数据库每个用例回滚，缓存不会，清掉避免读到上个用例的分类树
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='panel', password='testpass123')
+
+    def test_mindmap_tree_served_from_sidebar_cache(self):
+        url = reverse('learning:knowledge_panel_mindmap')
+        self.client.get(url)  # 预热 session / 侧栏缓存
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        learning_queries = [q for q in ctx.captured_queries if 'learning_' in q['sql']]
+        # 分类树走缓存，只剩表单里分类下拉框的 1 条
+        self.assertEqual(len(learning_queries), 1)
+
+        mind = json.loads(resp.context['mind_json'])
+        cats = mind['data']['children']
+        self.assertEqual(len(cats), 3)
+        self.assertEqual([len(c['children']) for c in cats], [3, 3, 3])
+
+    def test_sidebar_cache_invalidated_on_change(self):
+        url = reverse('learning:knowledge_panel')
+        self.assertNotContains(self.client.get(url), '新文章')
+        Topic.objects.create(category=Category.objects.first(), title='新文章', content='正文')
+        self.assertContains(self.client.get(url), '新文章')
+        Topic.objects.filter(title='新文章').get().delete()
+        self.assertNotContains(self.client.get(url), '新文章')
+
+    def test_mindmap_json_refreshed_on_change(self):
+        url = reverse('learning:knowledge_panel_mindmap')
+        self.assertNotIn('新文章', self.client.get(url).context['mind_json'])
+        Topic.objects.create(category=Category.objects.first(), title='新文章', content='正文')
+        self.assertIn('新文章', self.client.get(url).context['mind_json'])
+
+    def test_create_topic_redirect_per_view(self):
+        data = {'action': 'create_topic', 'title': '面板文章', 'category': Category.objects.first().id,
+                'level': 1, 'content': '正文'}
+        resp = self.client.post(reverse('learning:knowledge_panel'), data)
+        self.assertRedirects(resp, reverse('learning:knowledge_panel'))
+
+        data['title'] = '导图文章'
+        resp = self.client.post(reverse('learning:knowledge_panel_mindmap'), data)
+        topic = Topic.objects.get(title='导图文章')
+        self.assertRedirects(resp, reverse('learning:topic_update', args=[topic.id]))
+        self.assertEqual(topic.author_name, 'panel')
+
+    def test_panel_page(self):
+        resp = self.client.get(reverse('learning:knowledge_panel'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, '文章2-2')
+
+
+class MarkdownUploadTest(TestCase):
+    """测试上传 Markdown 文件"""
+
+    def test_read_upload_across_chunks(self):
+        text = '前言\r\n\r\n# 中文标题\r\n\r\n' + '正文' * 5000
+        upload = SimpleUploadedFile('note.md', text.encode('utf-8'))
+        # 块大小取奇数，保证多字节字符会被切在块边界上
+        upload.chunks = lambda chunk_size=None, _f=upload.chunks: _f(chunk_size=1001)
+        content, title = _read_markdown_upload(upload)
+        self.assertEqual(content, text)
+        self.assertEqual(title, '中文标题')
+
+        # 标题行被块边界切开、没有一级标题、只有 "## " 时的情况
+        for text, expected in (('a' * 1000 + '\n# 跨块标题\n正文\n# 第二个', '跨块标题'),
+                               ('## 二级\n正文', ''), ('x' * 3000 + '\n# 结尾标题', '结尾标题')):
+            upload = SimpleUploadedFile('note.md', text.encode('utf-8'))
+            upload.chunks = lambda chunk_size=None, _f=upload.chunks: _f(chunk_size=1001)
+            self.assertEqual(_read_markdown_upload(upload), (text, expected))
+
+    def test_create_topic_from_upload(self):
+        User.objects.create_user(username='writer', password='testpass123')
+        category = Category.objects.create(name='分类')
+        client = Client()
+        client.login(username='writer', password='testpass123')
+        resp = client.post(reverse('learning:topic_create'), {
+            'title': '手填标题',
+            'category': category.id,
+            'level': 1,
+            'content': '',
+            'markdown_file': SimpleUploadedFile('note.md', '# 文件标题\n\n文件正文'.encode('utf-8')),
+        })
+        topic = Topic.objects.get()
+        self.assertRedirects(resp, reverse('learning:topic_detail', args=[topic.id]))
+        self.assertEqual(topic.title, '手填标题')
+        self.assertIn('文件正文', topic.content)
+
+
+class RenderMarkdownTest(TestCase):
+    """测试复用 Markdown 实例时各次渲染互不影响"""
+
+    def test_toc_state_reset_between_renders(self):
+        html1, toc1 = render_markdown('# 第一篇\n\n## 小节')
+        html2, toc2 = render_markdown('正文，没有标题')
+        self.assertIn('第一篇', toc1)
+        self.assertNotIn('第一篇', toc2)
+        self.assertNotIn('第一篇', html2)
+        # 同名标题的锚点 id 不应因上一次渲染而递增
+        html3, _ = render_markdown('# 第一篇')
+        self.assertIn('id="_1"', html1)
+        self.assertEqual(html1.split('</h1>')[0], html3.split('</h1>')[0])
+
+
+class PreprocessMarkdownTest(TestCase):
+    """测试裸 URL 自动加尖括号"""
+
+    def test_bare_url_wrapping(self):
+        cases = {
+            '见 https://a.com 和 http://b.cn/x?y=1': '见 <https://a.com> 和 <http://b.cn/x?y=1>',
+            '[t](https://a.com) ![i](https://b.com/p.png)': '[t](https://a.com) ![i](https://b.com/p.png)',
+            '<https://a.com> [参考 https://a.com]': '<https://a.com> [参考 https://a.com]',
+            'https://a.com/x[1]': '<https://a.com/x>[1]',
+            # 已在链接里的 URL，参数中嵌套的 URL 不再单独包一层
+            '[t](https://a.com/?u=https://b.com)': '[t](https://a.com/?u=https://b.com)',
+        }
+        for text, expected in cases.items():
+            self.assertEqual(_preprocess_markdown(text), expected)
+
+    def test_many_urls_linear(self):
+        text = 'https://a.com/x ' * 20000
+        self.assertEqual(_preprocess_markdown(text).count('<https://a.com/x>'), 20000)
+
+
+class IndexLabStatsTest(TestCase):
+    """测试首页靶场统计"""
+
+    def test_lab_stats_for_logged_in_user(self):
+        from playground.models import LabFavorite, LabProgress
+
+        user = User.objects.create_user(username='stats', password='testpass123')
+        LabProgress.objects.create(user=user, lab_slug='dialog', completed=True)
+        LabProgress.objects.create(user=user, lab_slug='drift', completed=False)
+        LabFavorite.objects.create(user=user, lab_slug='dialog')
+        client = Client()
+        client.login(username='stats', password='testpass123')
+
+        stats = client.get(reverse('learning:index')).context['lab_stats']
+        self.assertEqual(stats['completed_count'], 1)
+        self.assertEqual(stats['completed_slugs'], ['dialog'])
+        self.assertEqual(stats['favorites_count'], 1)
+        self.assertGreater(stats['total_labs'], 0)
+        self.assertEqual(stats['completion_rate'], round(1 / stats['total_labs'] * 100, 1))
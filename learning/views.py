@@ -1,35 +1,90 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch, Q
 from django.utils.html import escape
+import codecs
+import io
 import re
-import markdown as mdlib
+from collections import defaultdict
+from typing import Tuple
 from django.utils.safestring import mark_safe
 import json
 from .models import Category, Topic
 from .forms import TopicForm, CategoryForm
+from .rendering import strip_markdown
+from .signals import sidebar_version
 
+# 侧栏分类树缓存时长（秒）；内容变更时靠版本号立即失效，这里只是兜底
+SIDEBAR_CACHE_TIMEOUT = 3600
 
-def _preprocess_markdown(text: str) -> str:
+
+def _categories_with_topics():
     """
-    轻量预处理：
-    - 将裸 URL 包一层 <...>，让 Markdown 自动生成可点击链接。
-      例如：链接：https://example.com -> 链接：<https://example.com>
-    - 排除已经在 Markdown 链接/图片语法中的 URL：[text](url) 或 ![alt](url)
+    分类 + 文章树（侧栏、知识面板、思维导图共用）。
+    Prefetch 自带排序，遍历 c.topics.all() 直接命中预取缓存，整棵树固定 2 条查询；
+    文章只取展示需要的字段，不加载 content。
     """
-    if not text:
-        return ""
-    # 排除：已有 <、在 ]( 后面的（链接/图片）、在 )后面的
-    # 只处理独立的裸 URL
-    return re.sub(r"(?<![<\(])(https?://[^\s>\)\]]+)(?![^\[]*\])", r"<\1>", text)
+    return Category.objects.order_by('id').prefetch_related(
+        Prefetch(
+            'topics',
+            queryset=Topic.objects.only('id', 'title', 'level', 'category_id').order_by('id'),
+        )
+    )
 
-def index(request):
-    categories = Category.objects.prefetch_related('topics').all()
-    latest_topics = (
+
+def _read_markdown_upload(uploaded_file) -> Tuple[str, str]:
+    """
+    按块增量解码上传的 Markdown 文件，返回 (content, h1_title)。
+    解码结果直接写入 StringIO，不再先 read() 出整段 bytes，也不留分块列表；
+    一级标题（"# xxx" 行）在解码时逐行查找，找到第一个后就不再扫描后面的内容。
+    非 UTF-8 文件抛 UnicodeDecodeError，由调用方提示。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    out = io.StringIO()
+    title = None
+    tail = ''  # 上一块末尾还没遇到换行的半行，只在找标题时用
+    for chunk in uploaded_file.chunks():
+        text = decoder.decode(chunk)
+        out.write(text)
+        if title is None:
+            *lines, tail = (tail + text).split('\n')
+            title = next((line[2:].strip() for line in lines if line.startswith('# ')), None)
+            if not tail.startswith('# '):
+                # 不是标题行的半行只需留前两个字符判断开头，避免超长行反复拼接
+                tail = tail[:2]
+    out.write(decoder.decode(b'', final=True))
+    if title is None and tail.startswith('# '):
+        title = tail[2:].strip()
+    return out.getvalue(), title or ''
+
+
+def _sidebar_categories():
+    """
+    带缓存的分类 + 文章树：命中时不查库；Category / Topic 有任何变更都会
+    换版本号（见 signals.py），下一次请求重新构建。
+    """
+    return cache.get_or_set(
+        f'learning:sidebar:{sidebar_version()}',
+        lambda: list(_categories_with_topics()),
+        SIDEBAR_CACHE_TIMEOUT,
+    )
+
+
+def _latest_topics():
+    """最近更新的 8 篇文章：只取展示字段，不把 content 和渲染缓存拉进内存。"""
+    return (
         Topic.objects.select_related('category')
+        .only('id', 'title', 'updated_at', 'category_id', 'category__id', 'category__name')
         .order_by('-updated_at')[:8]
     )
+
+
+def index(request):
+    categories = _sidebar_categories()
+    latest_topics = _latest_topics()
     
     # 获取靶场统计数据
     lab_stats = {
@@ -55,12 +110,7 @@ def index(request):
         
         # 用户进度（仅登录用户）
         if request.user.is_authenticated:
-            lab_stats['completed_count'] = LabProgress.objects.filter(
-                user=request.user, completed=True
-            ).count()
-            lab_stats['favorites_count'] = LabFavorite.objects.filter(
-                user=request.user
-            ).count()
+            # 计数直接取列表长度，不再单独 count()，两条查询即可
             lab_stats['completed_slugs'] = list(
                 LabProgress.objects.filter(user=request.user, completed=True)
                 .values_list("lab_slug", flat=True)
@@ -69,6 +119,8 @@ def index(request):
                 LabFavorite.objects.filter(user=request.user)
                 .values_list("lab_slug", flat=True)
             )
+            lab_stats['completed_count'] = len(lab_stats['completed_slugs'])
+            lab_stats['favorites_count'] = len(lab_stats['favorite_slugs'])
             if lab_stats['total_labs'] > 0:
                 lab_stats['completion_rate'] = round(
                     lab_stats['completed_count'] / lab_stats['total_labs'] * 100, 1
@@ -107,19 +159,12 @@ def topic_create(request):
             uploaded_file = request.FILES.get('markdown_file')
             if uploaded_file:
                 try:
-                    content = uploaded_file.read().decode('utf-8')
+                    content, h1_title = _read_markdown_upload(uploaded_file)
                     topic.content = content
                     
-                    # 如果标题为空，尝试从文件内容第一行提取
+                    # 如果标题为空，尝试从文件内容的一级标题提取，还是没标题就用文件名
                     if not topic.title:
-                        lines = content.split('\n')
-                        for line in lines:
-                            if line.startswith('# '):
-                                topic.title = line[2:].strip()
-                                break
-                        # 如果还是没标题，用文件名
-                        if not topic.title:
-                            topic.title = uploaded_file.name.replace('.md', '')
+                        topic.title = h1_title or uploaded_file.name.replace('.md', '')
                 except Exception as e:
                     form.add_error('markdown_file', f'文件读取失败: {str(e)}')
                     return render(request, 'learning/topic_form.html', {'form': form})
@@ -132,39 +177,44 @@ def topic_create(request):
     
     return render(request, 'learning/topic_form.html', {'form': form})
 
+def _neighbor_topics(topic):
+    """
+    上一篇/下一篇（同一分类内，按 id 顺序）。
+    LAG/LEAD 窗口函数在子查询里算，外层只取当前这篇，一条查询只返回一行；
+    返回 (prev, next)，没有则为 None。
+    """
+    table = connection.ops.quote_name(Topic._meta.db_table)
+    sql = (
+        "SELECT prev_id, prev_title, next_id, next_title FROM ("
+        "SELECT id,"
+        " LAG(id) OVER w AS prev_id, LAG(title) OVER w AS prev_title,"
+        " LEAD(id) OVER w AS next_id, LEAD(title) OVER w AS next_title"
+        f" FROM {table} WHERE category_id = %s"
+        " WINDOW w AS (ORDER BY id)"
+        ") AS ordered WHERE id = %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [topic.category_id, topic.id])
+        row = cursor.fetchone()
+    if not row:
+        return None, None
+    prev_id, prev_title, next_id, next_title = row
+    prev_topic = {'id': prev_id, 'title': prev_title} if prev_id else None
+    next_topic = {'id': next_id, 'title': next_title} if next_id else None
+    return prev_topic, next_topic
+
+
 def topic_detail(request, topic_id):
-    categories = Category.objects.prefetch_related('topics').all()
+    categories = _sidebar_categories()
     topic = get_object_or_404(Topic, id=topic_id)
-    latest_topics = (
-        Topic.objects.select_related('category')
-        .order_by('-updated_at')[:8]
-    )
+    latest_topics = _latest_topics()
 
-    # 渲染 Markdown + 生成 TOC（标题目录 & 自动锚点）
-    # 额外启用 sane_lists，让“有缩进/混合段落”的列表更稳定。
-    md = mdlib.Markdown(
-        extensions=['fenced_code', 'codehilite', 'tables', 'toc', 'sane_lists', 'smarty'],
-        extension_configs={
-            'toc': {
-                'permalink': True,
-                'permalink_title': '复制链接',
-            }
-        }
-    )
-    rendered_content = md.convert(_preprocess_markdown(topic.content or ""))
-    toc_html = md.toc or ""
-
-    # 上一篇/下一篇（同一分类内，按 id 顺序）
-    prev_topic = (
-        Topic.objects.filter(category_id=topic.category_id, id__lt=topic.id)
-        .order_by('-id')
-        .first()
-    )
-    next_topic = (
-        Topic.objects.filter(category_id=topic.category_id, id__gt=topic.id)
-        .order_by('id')
-        .first()
-    )
+    # 渲染结果在 Topic.save() 时已缓存，这里只在缓存缺失/过期时补渲染
+    topic.ensure_rendered()
+    rendered_content = topic.content_html
+    toc_html = topic.toc_html
+
+    prev_topic, next_topic = _neighbor_topics(topic)
     context = {
         'categories': categories,
         'current_topic': topic,
@@ -198,19 +248,12 @@ def topic_update(request, topic_id):
             uploaded_file = request.FILES.get('markdown_file')
             if uploaded_file:
                 try:
-                    content = uploaded_file.read().decode('utf-8')
+                    content, h1_title = _read_markdown_upload(uploaded_file)
                     updated_topic.content = content
                     
-                    # 如果标题为空，尝试从文件内容第一行提取
+                    # 如果标题为空，尝试从文件内容的一级标题提取，还是没标题就用文件名
                     if not updated_topic.title:
-                        lines = content.split('\n')
-                        for line in lines:
-                            if line.startswith('# '):
-                                updated_topic.title = line[2:].strip()
-                                break
-                        # 如果还是没标题，用文件名
-                        if not updated_topic.title:
-                            updated_topic.title = uploaded_file.name.replace('.md', '')
+                        updated_topic.title = h1_title or uploaded_file.name.replace('.md', '')
                 except Exception as e:
                     form.add_error('markdown_file', f'文件读取失败: {str(e)}')
                     return render(request, 'learning/topic_form.html', {
@@ -247,7 +290,7 @@ def topic_delete(request, topic_id):
         return redirect('learning:index')
     
     # GET 请求时显示确认页面
-    categories = Category.objects.prefetch_related('topics').all()
+    categories = _sidebar_categories()
     context = {
         'categories': categories,
         'current_topic': topic,
@@ -256,14 +299,48 @@ def topic_delete(request, topic_id):
     return render(request, 'learning/index.html', context)
 
 
+def _make_snippet(hay: str, q_re: "re.Pattern[str]", radius: int = 60) -> str:
+    """
+    生成高亮摘要 HTML（已 escape），优先从正文命中处截取。
+    hay 为去掉 Markdown 符号后的纯文本（Topic.stripped_content），q_re 由调用方编译一次后复用。
+    """
+    m = q_re.search(hay)
+    if not m:
+        # 如果内容没命中，就给个开头摘要
+        base = hay[:140]
+        return escape(base) + ("…" if len(hay) > 140 else "")
+
+    start = max(0, m.start() - radius)
+    end = min(len(hay), m.end() + radius)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(hay) else ""
+    piece = hay[start:end]
+    # 高亮：按原文中的匹配位置切片，逐段 escape 后拼接，避免在 escape 后的文本里再匹配一次
+    # （查询词含 & < > 时，escape 后就匹配不上了）
+    parts = []
+    last = 0
+    for mm in q_re.finditer(piece):
+        parts.append(escape(piece[last:mm.start()]))
+        parts.append(f"<mark>{escape(mm.group(0))}</mark>")
+        last = mm.end()
+    parts.append(escape(piece[last:]))
+    highlighted = "".join(parts)
+    return prefix + highlighted + suffix
+
+
 def search(request):
     q = (request.GET.get('q') or '').strip()
-    categories = Category.objects.prefetch_related('topics').all()
+    categories = _sidebar_categories()
 
     results = Topic.objects.none()
     if q:
         results = (
             Topic.objects.select_related('category')
+            # 摘要直接用缓存的纯文本；content 和渲染后的 HTML 都不加载
+            .only(
+                'id', 'title', 'level', 'updated_at', 'stripped_content', 'render_version',
+                'category_id', 'category__id', 'category__name',
+            )
             .filter(
                 Q(title__icontains=q)
                 | Q(content__icontains=q)
@@ -272,50 +349,19 @@ def search(request):
             .order_by('-updated_at')[:50]
         )
 
-    def _strip_markdown(text: str) -> str:
-        """非常轻量的 Markdown 清理，用于搜索摘要展示（不追求完全准确）。"""
-        if not text:
-            return ""
-        # 去掉代码块/行内代码的反引号
-        text = re.sub(r"```[\s\S]*?```", " ", text)
-        text = re.sub(r"`([^`]+)`", r"\1", text)
-        # 链接/图片: ![alt](url) / [text](url)
-        text = re.sub(r"!\[([^\]]*)\]\([^)]+\)", r"\1", text)
-        text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-        # 标题/加粗/斜体等符号
-        text = re.sub(r"[*_~#>]+", " ", text)
-        # 多空白压缩
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-
-    def _make_snippet(title: str, category_name: str, content: str, query: str, radius: int = 60) -> str:
-        """生成高亮摘要 HTML（已 escape），优先从 content 命中处截取。"""
-        if not query:
-            return ""
-        hay = _strip_markdown(content)
-        q_re = re.compile(re.escape(query), re.IGNORECASE)
-        m = q_re.search(hay)
-        if not m:
-            # 如果内容没命中，就给个开头摘要
-            base = hay[:140]
-            return escape(base) + ("…" if len(hay) > 140 else "")
-
-        start = max(0, m.start() - radius)
-        end = min(len(hay), m.end() + radius)
-        prefix = "…" if start > 0 else ""
-        suffix = "…" if end < len(hay) else ""
-        piece = hay[start:end]
-        # 高亮：先 escape，再替换匹配为 <mark>
-        escaped_piece = escape(piece)
-        highlighted = q_re.sub(lambda mm: f"<mark>{escape(mm.group(0))}</mark>", escaped_piece)
-        return prefix + highlighted + suffix
-
     results_with_snippet = []
-    for t in results:
-        results_with_snippet.append({
-            "obj": t,
-            "snippet": _make_snippet(t.title, t.category.name if t.category else "", t.content, q),
-        })
+    if q:
+        q_re = re.compile(re.escape(q), re.IGNORECASE)
+        # iterator()：不再额外保留一份 queryset 结果缓存
+        for t in results.iterator(chunk_size=50):
+            # 老数据/bulk_create 写入的文章还没有纯文本缓存，这里补上
+            t.ensure_rendered()
+            results_with_snippet.append({
+                "obj": t,
+                "snippet": _make_snippet(t.stripped_content, q_re),
+            })
+            # 模板只用摘要，整篇纯文本生成完摘要即可释放
+            t.stripped_content = ''
 
     return render(request, 'learning/search_results.html', {
         'categories': categories,
@@ -324,6 +370,49 @@ def search(request):
     })
 
 
+def _handle_panel_create(request, action, redirect_name, open_editor):
+    """
+    知识面板 / 思维导图共用的“新建分类 / 新建文章”处理。
+    成功（或上传文件读取失败）时返回重定向；表单校验失败返回 None，由调用方继续渲染页面。
+    open_editor 为 True 时，文章创建后跳到编辑页。
+    """
+    if action == 'create_category':
+        c_form = CategoryForm(request.POST)
+        if c_form.is_valid():
+            c_form.save()
+            messages.success(request, '分类已创建')
+            return redirect(redirect_name)
+        messages.error(request, '分类创建失败，请检查填写')
+        return None
+
+    t_form = TopicForm(request.POST, request.FILES)
+    if not t_form.is_valid():
+        messages.error(request, '文章创建失败：请填写内容或上传 Markdown 文件')
+        return None
+
+    topic = t_form.save(commit=False)
+    topic.author = request.user
+    topic.author_name = (t_form.cleaned_data.get('author_name') or request.user.username)
+
+    uploaded_file = request.FILES.get('markdown_file')
+    if uploaded_file:
+        try:
+            content, h1_title = _read_markdown_upload(uploaded_file)
+            topic.content = content
+            if not topic.title:
+                # 尝试从 H1 提取
+                topic.title = h1_title or uploaded_file.name.replace('.md', '')
+        except Exception as e:
+            messages.error(request, f'Markdown 文件读取失败: {str(e)}')
+            return redirect(redirect_name)
+
+    topic.save()
+    messages.success(request, '文章节点已创建')
+    if open_editor:
+        return redirect('learning:topic_update', topic_id=topic.id)
+    return redirect(redirect_name)
+
+
 @login_required
 def knowledge_panel(request):
     """
@@ -334,45 +423,11 @@ def knowledge_panel(request):
     if request.method == 'POST':
         action = request.POST.get('action')
 
-        if action == 'create_category':
-            c_form = CategoryForm(request.POST)
-            if c_form.is_valid():
-                c_form.save()
-                messages.success(request, '分类已创建')
-                return redirect('learning:knowledge_panel')
-            else:
-                messages.error(request, '分类创建失败，请检查填写')
-
-        elif action == 'create_topic':
-            t_form = TopicForm(request.POST, request.FILES)
-            if t_form.is_valid():
-                topic = t_form.save(commit=False)
-                topic.author = request.user
-                topic.author_name = (t_form.cleaned_data.get('author_name') or request.user.username)
-
-                uploaded_file = request.FILES.get('markdown_file')
-                if uploaded_file:
-                    try:
-                        content = uploaded_file.read().decode('utf-8')
-                        topic.content = content
-                        if not topic.title:
-                            # 尝试从 H1 提取
-                            for line in content.split('\n'):
-                                if line.startswith('# '):
-                                    topic.title = line[2:].strip()
-                                    break
-                            if not topic.title:
-                                topic.title = uploaded_file.name.replace('.md', '')
-                    except Exception as e:
-                        messages.error(request, f'Markdown 文件读取失败: {str(e)}')
-                        return redirect('learning:knowledge_panel')
-
-                topic.save()
-                messages.success(request, '文章节点已创建')
-                # 大纲视图：创建后留在面板，不自动跳到编辑页
-                return redirect('learning:knowledge_panel')
-            else:
-                messages.error(request, '文章创建失败：请填写内容或上传 Markdown 文件')
+        if action in ('create_category', 'create_topic'):
+            # 大纲视图：创建文章后留在面板，不自动跳到编辑页
+            response = _handle_panel_create(request, action, 'learning:knowledge_panel', open_editor=False)
+            if response:
+                return response
 
         elif action == 'delete_topic':
             topic_id = request.POST.get('topic_id')
@@ -409,7 +464,7 @@ def knowledge_panel(request):
         else:
             messages.error(request, '未知操作')
 
-    categories = Category.objects.prefetch_related('topics').all().order_by('id')
+    categories = _sidebar_categories()
     embed = (request.GET.get('embed') == '1')
     return render(request, 'learning/panel.html', {
         'categories': categories,
@@ -419,57 +474,8 @@ def knowledge_panel(request):
     })
 
 
-@login_required
-def knowledge_panel_mindmap(request):
-    """
-    思维导图式知识面板（带连线，左->右展开）。
-    """
-    # 复用与 /panel/ 一致的创建逻辑（简化：仍用同样的 action）
-    if request.method == 'POST':
-        action = request.POST.get('action')
-
-        if action == 'create_category':
-            c_form = CategoryForm(request.POST)
-            if c_form.is_valid():
-                c_form.save()
-                messages.success(request, '分类已创建')
-                return redirect('learning:knowledge_panel_mindmap')
-            messages.error(request, '分类创建失败，请检查填写')
-
-        elif action == 'create_topic':
-            t_form = TopicForm(request.POST, request.FILES)
-            if t_form.is_valid():
-                topic = t_form.save(commit=False)
-                topic.author = request.user
-                topic.author_name = (t_form.cleaned_data.get('author_name') or request.user.username)
-
-                uploaded_file = request.FILES.get('markdown_file')
-                if uploaded_file:
-                    try:
-                        content = uploaded_file.read().decode('utf-8')
-                        topic.content = content
-                        if not topic.title:
-                            for line in content.split('\n'):
-                                if line.startswith('# '):
-                                    topic.title = line[2:].strip()
-                                    break
-                            if not topic.title:
-                                topic.title = uploaded_file.name.replace('.md', '')
-                    except Exception as e:
-                        messages.error(request, f'Markdown 文件读取失败: {str(e)}')
-                        return redirect('learning:knowledge_panel_mindmap')
-
-                topic.save()
-                messages.success(request, '文章节点已创建')
-                return redirect('learning:topic_update', topic_id=topic.id)
-
-            messages.error(request, '文章创建失败：请填写内容或上传 Markdown 文件')
-
-        else:
-            messages.error(request, '未知操作')
-
-    categories = Category.objects.prefetch_related('topics').all().order_by('id')
-
+def _build_mindmap_json() -> str:
+    """整棵分类/文章树序列化成 jsMind 需要的 JSON。"""
     # jsMind 数据结构（node_tree），强制全部向右展开
     root = {
         "id": "root",
@@ -478,26 +484,32 @@ def knowledge_panel_mindmap(request):
         "direction": "right",
         "children": [],
     }
-    for c in categories:
+    # 只取字典，不实例化模型；文章按分类一次分桶
+    cats = list(Category.objects.order_by('id').values('id', 'name'))
+    topics_by_cat = defaultdict(list)
+    for t in Topic.objects.order_by('id').values('id', 'title', 'category_id'):
+        topics_by_cat[t['category_id']].append(t)
+
+    for c in cats:
         cat_node = {
-            "id": f"cat-{c.id}",
-            "topic": c.name,
+            "id": f"cat-{c['id']}",
+            "topic": c['name'],
             "direction": "right",
             "expanded": True,
             "kind": "category",
-            "category_id": c.id,
+            "category_id": c['id'],
             "children": [],
         }
-        for t in c.topics.all():
+        for t in topics_by_cat[c['id']]:
             cat_node["children"].append({
-                "id": f"topic-{t.id}",
-                "topic": t.title,
+                "id": f"topic-{t['id']}",
+                "topic": t['title'],
                 "direction": "right",
                 "expanded": True,
                 "kind": "topic",
-                "topic_id": t.id,
-                "url": f"/topic/{t.id}/",
-                "edit_url": f"/topic/{t.id}/edit/",
+                "topic_id": t['id'],
+                "url": f"/topic/{t['id']}/",
+                "edit_url": f"/topic/{t['id']}/edit/",
             })
         root["children"].append(cat_node)
 
@@ -506,10 +518,40 @@ def knowledge_panel_mindmap(request):
         "format": "node_tree",
         "data": root,
     }
+    return json.dumps(mind, ensure_ascii=False)
+
+
+def _mindmap_json() -> str:
+    """思维导图 JSON 与侧栏共用版本号缓存，内容变更后自动换 key。"""
+    return cache.get_or_set(
+        f'learning:mindmap:{sidebar_version()}',
+        _build_mindmap_json,
+        SIDEBAR_CACHE_TIMEOUT,
+    )
+
+
+@login_required
+def knowledge_panel_mindmap(request):
+    """
+    思维导图式知识面板（带连线，左->右展开）。
+    """
+    # 复用与 /panel/ 一致的创建逻辑（简化：仍用同样的 action）
+    if request.method == 'POST':
+        action = request.POST.get('action')
+
+        if action in ('create_category', 'create_topic'):
+            response = _handle_panel_create(request, action, 'learning:knowledge_panel_mindmap', open_editor=True)
+            if response:
+                return response
+
+        else:
+            messages.error(request, '未知操作')
+
+    categories = _sidebar_categories()
 
     return render(request, 'learning/panel_mindmap.html', {
         "categories": categories,
         "category_form": CategoryForm(),
         "topic_form": TopicForm(),
-        "mind_json": json.dumps(mind, ensure_ascii=False),
+        "mind_json": _mindmap_json(),
     })
@@ -15,6 +15,7 @@ class AttemptAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "challenge", "is_correct", "timestamp")
     list_filter = ("is_correct", "timestamp")
     search_fields = ("user__username", "challenge__title")
+    list_select_related = ("user", "challenge")
 
 
 @admin.register(LLMConfig)
@@ -28,6 +29,7 @@ class AgentMemoryAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "scenario", "updated_at")
     list_filter = ("scenario", "updated_at")
     search_fields = ("user__username", "scenario")
+    list_select_related = ("user",)
 
 
 @admin.register(RAGDocument)
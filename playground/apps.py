@@ -6,66 +6,84 @@ class PlaygroundConfig(AppConfig):
     name = 'playground'
 
     def ready(self):
-        """Django 启动时自动创建靶场必需的初始数据"""
-        import threading
-        # 用 timer 延迟执行，避免在 migrate 时出错（表还不存在）
-        threading.Timer(2.0, _ensure_initial_data).start()
+        from django.db.models.signals import post_migrate
 
+        from . import signals  # noqa: F401  注册 Agent 配置缓存失效的信号处理
 
-def _ensure_initial_data():
+        # migrate 完成后（表一定已存在）补齐靶场必需的初始数据；
+        # 启动脚本 / Docker 每次启动都会先跑 migrate，shell、check 等其它命令不再触发
+        post_migrate.connect(_ensure_initial_data_handler, sender=self)
+
+
+def _ensure_initial_data_handler(sender, using='default', **kwargs):
+    """post_migrate 信号处理：对刚迁移的数据库补齐演示数据。"""
+    _ensure_initial_data(using=using)
+
+
+def _ensure_initial_data(using='default'):
     """确保靶场必需的演示数据存在（幂等，已存在则跳过）"""
-    try:
-        from .models import Challenge
+    from django.db import connections, transaction
+
+    from .models import Challenge
 
-        # 工具调用投毒靶场需要的 Challenge 题目（给 Agent 操作用）
-        demos = [
-            {
-                'title': '本地提权驱动分析',
-                'defaults': {
-                    'description': '分析一个可疑的 Windows 驱动，判断是否存在本地提权漏洞。',
-                    'difficulty': 'hard', 'flag': 'FLAG{dummy_local_priv_esc}', 'points': 100,
-                },
+    # 例如 migrate playground zero 之后表已被删掉，这时什么都不做
+    if Challenge._meta.db_table not in connections[using].introspection.table_names():
+        return
+
+    # 工具调用投毒靶场需要的 Challenge 题目（给 Agent 操作用）
+    demos = [
+        {
+            'title': '本地提权驱动分析',
+            'defaults': {
+                'description': '分析一个可疑的 Windows 驱动，判断是否存在本地提权漏洞。',
+                'difficulty': 'hard', 'flag': 'FLAG{dummy_local_priv_esc}', 'points': 100,
             },
-            {
-                'title': '记忆投毒攻击模拟',
-                'defaults': {
-                    'description': '通过提示词和长期记忆，诱导 Agent 调用危险工具删除数据。',
-                    'difficulty': 'medium', 'flag': 'FLAG{dummy_memory_poisoning}', 'points': 80,
-                },
+        },
+        {
+            'title': '记忆投毒攻击模拟',
+            'defaults': {
+                'description': '通过提示词和长期记忆，诱导 Agent 调用危险工具删除数据。',
+                'difficulty': 'medium', 'flag': 'FLAG{dummy_memory_poisoning}', 'points': 80,
             },
-            {
-                'title': '日志泄露检测',
-                'defaults': {
-                    'description': '检查系统日志中是否存在敏感信息泄露，并给出修复建议。',
-                    'difficulty': 'easy', 'flag': 'FLAG{dummy_log_leak}', 'points': 50,
-                },
+        },
+        {
+            'title': '日志泄露检测',
+            'defaults': {
+                'description': '检查系统日志中是否存在敏感信息泄露，并给出修复建议。',
+                'difficulty': 'easy', 'flag': 'FLAG{dummy_log_leak}', 'points': 50,
             },
-            {
-                'title': 'SQL 注入漏洞挖掘',
-                'defaults': {
-                    'description': '对目标 Web 应用进行 SQL 注入测试，获取数据库管理员密码。',
-                    'difficulty': 'medium', 'flag': 'FLAG{dummy_sqli_admin}', 'points': 70,
-                },
+        },
+        {
+            'title': 'SQL 注入漏洞挖掘',
+            'defaults': {
+                'description': '对目标 Web 应用进行 SQL 注入测试，获取数据库管理员密码。',
+                'difficulty': 'medium', 'flag': 'FLAG{dummy_sqli_admin}', 'points': 70,
             },
-            {
-                'title': 'XSS 跨站脚本攻击',
-                'defaults': {
-                    'description': '在评论功能中发现并利用存储型 XSS 漏洞。',
-                    'difficulty': 'easy', 'flag': 'FLAG{dummy_stored_xss}', 'points': 40,
-                },
+        },
+        {
+            'title': 'XSS 跨站脚本攻击',
+            'defaults': {
+                'description': '在评论功能中发现并利用存储型 XSS 漏洞。',
+                'difficulty': 'easy', 'flag': 'FLAG{dummy_stored_xss}', 'points': 40,
             },
-        ]
+        },
+    ]
 
-        created = 0
-        for item in demos:
-            _, was_created = Challenge.objects.get_or_create(title=item['title'], defaults=item['defaults'])
-            if was_created:
-                created += 1
-
-        if created > 0:
-            import logging
-            logging.getLogger('playground').info(f'自动创建了 {created} 条 Challenge 演示数据')
+    # 一次查出已存在的标题，缺的一次 bulk_create；title 没有唯一约束（用户可自建同名题目），
+    # 所以不用 ignore_conflicts，而是先按标题去重
+    with transaction.atomic(using=using):
+        existing = set(
+            Challenge.objects.using(using).filter(title__in=[item['title'] for item in demos])
+            .values_list('title', flat=True)
+        )
+        missing = [
+            Challenge(title=item['title'], **item['defaults'])
+            for item in demos
+            if item['title'] not in existing
+        ]
+        Challenge.objects.using(using).bulk_create(missing)
+    created = len(missing)
 
-    except Exception:
-        # migrate 阶段表不存在等情况，静默忽略
-        pass
+    if created > 0:
+        import logging
+        logging.getLogger('playground').info(f'自动创建了 {created} 条 Challenge 演示数据')
@@ -5,9 +5,10 @@ CSWSH 靶场：故意不校验 Origin、不校验 CSRF 的 WebSocket 聊天消
 """
 from __future__ import annotations
 
-import json
 import asyncio
-from typing import Any, List
+import json
+import threading
+from typing import Any
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -15,14 +16,11 @@ from channels.db import database_sync_to_async
 from .agent import MemoryAgent
 
 
-def _cswsh_stream_llm(user_msg: str) -> List[str]:
-    """同步：用当前靶场配置调用大模型流式接口，返回内容块列表。"""
-    agent = MemoryAgent(memory=[])
-    messages = [
-        {"role": "system", "content": "你是一个助手。请用简洁自然的语言回复用户。本靶场使用 WebSocket 流式推送。"},
-        {"role": "user", "content": user_msg},
-    ]
-    return list(agent.call_llm_stream(messages))
+# 流式推送的合帧阈值：字符数 / 时间间隔（秒）
+CHUNK_FLUSH_CHARS = 64
+CHUNK_FLUSH_INTERVAL = 0.02
+
+_CSWSH_SYSTEM_PROMPT = "你是一个助手。请用简洁自然的语言回复用户。本靶场使用 WebSocket 流式推送。"
 
 
 class CswshChatConsumer(AsyncWebsocketConsumer):
@@ -54,11 +52,57 @@ class CswshChatConsumer(AsyncWebsocketConsumer):
         msg = (data.get("message") or "").strip()
         if not msg:
             return
-        chunks = await database_sync_to_async(_cswsh_stream_llm)(msg)
+        # 只有读取 LLM 配置需要同步线程；上游返回一块就推送一块，不等整段回复生成完
+        agent = await database_sync_to_async(MemoryAgent)(memory=[])
+        messages = [
+            {"role": "system", "content": _CSWSH_SYSTEM_PROMPT},
+            {"role": "user", "content": msg},
+        ]
+        # 中文增量常常只有一两个字，逐块发帧时帧头比内容还大；
+        # 攒够 CHUNK_FLUSH_CHARS 个字符，或缓冲区里有内容且距上次发送满 CHUNK_FLUSH_INTERVAL 秒
+        # （不论下一块有没有到）就合并成一帧发出，上游卡住时已收到的尾巴也不会一直压着
+        loop = asyncio.get_running_loop()
+        chunks = []
+        pending = []
+        pending_len = 0
+        last_flush = loop.time()
+
+        async def flush() -> None:
+            nonlocal pending_len, last_flush
+            await self.send(text_data=json.dumps({"type": "chunk", "text": "".join(pending)}))
+            pending.clear()
+            pending_len = 0
+            last_flush = loop.time()
+
+        stream = agent.acall_llm_stream(messages).__aiter__()
+        next_chunk = None
+        try:
+            while True:
+                if next_chunk is None:
+                    # 下一块放在单独的任务里等：超时只是先发缓冲区，不取消上游的读取
+                    next_chunk = asyncio.ensure_future(stream.__anext__())
+                if pending:
+                    timeout = max(0.0, last_flush + CHUNK_FLUSH_INTERVAL - loop.time())
+                    await asyncio.wait({next_chunk}, timeout=timeout)
+                    if not next_chunk.done():
+                        await flush()
+                        continue
+                try:
+                    c = await next_chunk
+                except StopAsyncIteration:
+                    break
+                next_chunk = None
+                chunks.append(c)
+                pending.append(c)
+                pending_len += len(c)
+                if pending_len >= CHUNK_FLUSH_CHARS:
+                    await flush()
+        finally:
+            if next_chunk is not None and not next_chunk.done():
+                next_chunk.cancel()
+        if pending:
+            await flush()
         full_reply = "".join(chunks)
-        for c in chunks:
-            await self.send(text_data=json.dumps({"type": "chunk", "text": c}))
-            await asyncio.sleep(0.02)
         await self.send(text_data=json.dumps({"type": "done", "text": full_reply}))
         await self.channel_layer.group_send(
             self.group_name,
@@ -83,22 +127,29 @@ class CswshChatConsumer(AsyncWebsocketConsumer):
 
 
 # DoS 靶场：仅接受连接并计数，不校验连接数上限（演示拒绝服务）
+# 计数由 WebSocket 协程修改、HTTP 视图（可能在线程池里）读取，读改写都加锁
 _dos_connection_count: int = 0
+_dos_count_lock = threading.Lock()
 
 
 def get_dos_connection_count() -> int:
     """供 HTTP 视图读取当前 DoS 演示用的 WebSocket 连接数。"""
-    return _dos_connection_count
+    with _dos_count_lock:
+        return _dos_connection_count
+
+
+def _add_dos_connections(delta: int) -> None:
+    global _dos_connection_count
+    with _dos_count_lock:
+        _dos_connection_count = max(0, _dos_connection_count + delta)
 
 
 class DosConsumer(AsyncWebsocketConsumer):
     """故意不限制单客户端连接数，用于演示 WebSocket DoS。仅 accept，不处理消息。"""
 
     async def connect(self) -> None:
-        global _dos_connection_count
         await self.accept()
-        _dos_connection_count += 1
+        _add_dos_connections(1)
 
     async def disconnect(self, close_code: int) -> None:
-        global _dos_connection_count
-        _dos_connection_count = max(0, _dos_connection_count - 1)
+        _add_dos_connections(-1)
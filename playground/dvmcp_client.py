@@ -9,17 +9,38 @@ MCP SSE 协议流程：
 """
 
 import json
+import re
 import httpx
 import threading
-import queue
 import time
 import os
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Any, Mapping, Optional
+from urllib.parse import parse_qsl, urlsplit
 from dataclasses import dataclass, field
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# SSE 的 event/data 字段行，一次匹配同时拿到字段名和去掉首尾空白的值
+_SSE_FIELD_RE = re.compile(r'(event|data):\s*(.*?)\s*$')
+
+# MCP 请求都是发往同一台 DVMCP Server 的小报文，保持少量长连接即可
+_MCP_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=16, keepalive_expiry=60)
+
+# 拉取工具列表时用来并发发送 JSON-RPC 请求的小线程池（模块级复用，不必每次新建线程）
+_MCP_POST_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dvmcp-post')
+
+# 实时拉取工具列表：单次连接/读写的超时，以及整个 SSE 会话的总时长上限（秒）
+_FETCH_TOOLS_TIMEOUT = httpx.Timeout(connect=2.0, read=5.0, write=2.0, pool=1.0)
+_FETCH_TOOLS_DEADLINE = 8.0
+
+# 实时拉到的工具/资源列表进程内缓存：challenge_id -> (拉取时刻, 数据)；不主动失效，超过 TTL 后重新拉取
+TOOLS_CACHE_TTL = 30.0
+_TOOLS_CACHE: Dict[int, tuple] = {}
+_TOOLS_CACHE_LOCK = threading.Lock()
+
 
 def _get_dvmcp_host() -> str:
     '''获取 DVMCP 服务地址（支持 Docker 环境）'''
@@ -38,6 +59,17 @@ class MCPSSEClient:
         self.session_id: Optional[str] = None
         self.message_url: Optional[str] = None
         self._request_id = 0
+        # 同一个客户端的 SSE 握手和后续 JSON-RPC 请求共用连接池，避免每条消息都重新建连
+        self._client = httpx.Client(timeout=timeout, limits=_MCP_HTTP_LIMITS)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> "MCPSSEClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def _get_next_id(self) -> int:
         self._request_id += 1
@@ -50,46 +82,43 @@ class MCPSSEClient:
         MCP SSE 协议：服务器会在 SSE 流中发送 endpoint 事件
         """
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                # 使用流式请求获取 SSE 事件
-                with client.stream('GET', self.sse_url) as response:
-                    if response.status_code != 200:
-                        logger.error(f"SSE 连接失败: HTTP {response.status_code}")
-                        return False
-                    
-                    # 读取 SSE 事件直到获得 endpoint
-                    buffer = ""
-                    for chunk in response.iter_text():
-                        buffer += chunk
-                        
-                        # 解析 SSE 事件
-                        while "\n\n" in buffer:
-                            event_str, buffer = buffer.split("\n\n", 1)
-                            
-                            # 解析事件
-                            event_type = None
-                            event_data = None
-                            
-                            for line in event_str.split("\n"):
-                                if line.startswith("event:"):
-                                    event_type = line[6:].strip()
-                                elif line.startswith("data:"):
-                                    event_data = line[5:].strip()
-                            
-                            # 检查是否是 endpoint 事件
-                            if event_type == "endpoint" and event_data:
-                                # endpoint 数据格式: /messages/?session_id=xxx
-                                self.message_url = f"{self.base_url}{event_data}"
-                                # 提取 session_id
-                                if "session_id=" in event_data:
-                                    self.session_id = event_data.split("session_id=")[1].split("&")[0]
-                                logger.info(f"获取到消息端点: {self.message_url}")
-                                return True
-                        
-                        # 设置超时保护
-                        if time.time() - response.elapsed.total_seconds() > 5:
-                            break
-                    
+            # 使用流式请求获取 SSE 事件
+            with self._client.stream('GET', self.sse_url) as response:
+                if response.status_code != 200:
+                    logger.error(f"SSE 连接失败: HTTP {response.status_code}")
+                    return False
+                
+                # 逐行读取 SSE 事件直到获得 endpoint：只保留当前事件的字段，
+                # 空行表示一个事件结束，不再反复切分越积越长的缓冲区
+                event_type = None
+                event_data = None
+                # 最多等 5 秒 endpoint 事件（单调时钟，不受系统时间调整影响）
+                deadline = time.monotonic() + 5.0
+                for line in response.iter_lines():
+                    if line:
+                        m = _SSE_FIELD_RE.match(line)
+                        if m:
+                            if m[1] == "event":
+                                event_type = m[2]
+                            else:
+                                event_data = m[2]
+                        continue
+
+                    # 检查是否是 endpoint 事件
+                    if event_type == "endpoint" and event_data:
+                        # endpoint 数据格式: /messages/?session_id=xxx
+                        self.message_url = f"{self.base_url}{event_data}"
+                        # 提取 session_id（按查询串解析，带 URL 编码的值也能正确还原）
+                        self.session_id = dict(parse_qsl(urlsplit(event_data).query)).get("session_id")
+                        logger.info(f"获取到消息端点: {self.message_url}")
+                        return True
+                    event_type = None
+                    event_data = None
+
+                    # 设置超时保护
+                    if time.monotonic() > deadline:
+                        break
+
         except Exception as e:
             logger.error(f"连接 MCP 服务器失败: {e}")
         
@@ -110,27 +139,23 @@ class MCPSSEClient:
         }
         
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(
-                    self.message_url,
-                    json=request,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    # MCP 通过 SSE 返回响应，这里可能收到 "Accepted"
-                    text = response.text
-                    if text and text != "Accepted":
-                        try:
-                            return json.loads(text)
-                        except json.JSONDecodeError:
-                            pass
-                    return {"status": "accepted"}
-                elif response.status_code == 202:
-                    return {"status": "accepted"}
-                else:
-                    logger.error(f"请求失败: HTTP {response.status_code}")
-                    return None
+            # json= 会自动带上 Content-Type: application/json，不必每次另建请求头
+            response = self._client.post(self.message_url, json=request)
+            
+            if response.status_code == 200:
+                # MCP 通过 SSE 返回响应，这里可能收到 "Accepted"
+                text = response.text
+                if text and text != "Accepted":
+                    try:
+                        return json.loads(text)
+                    except json.JSONDecodeError:
+                        pass
+                return {"status": "accepted"}
+            elif response.status_code == 202:
+                return {"status": "accepted"}
+            else:
+                logger.error(f"请求失败: HTTP {response.status_code}")
+                return None
         except Exception as e:
             logger.error(f"发送请求失败: {e}")
             return None
@@ -170,172 +195,195 @@ class MCPSSEClient:
 
 def _fetch_tools_via_sse(port: int) -> Optional[Dict[str, Any]]:
     """通过完整 SSE 协议获取 MCP Server 的真实 tools/list 和 resources/list"""
-    import threading, queue
     mcp_base = f'http://{_get_dvmcp_host()}:{port}'
-    result_q: queue.Queue = queue.Queue()
-
-    def _worker():
-        """在独立线程中完成 SSE 连接 + 请求 + 读结果"""
-        tools_result = None
-        resources_result = None
-        try:
-            with httpx.Client(timeout=8.0) as http_client:
-                with http_client.stream('GET', f'{mcp_base}/sse') as sse:
-                    endpoint_url = None
-                    current_event = None
-                    n = 0
-                    for line in sse.iter_lines():
-                        n += 1
-                        if line.startswith('event: '):
-                            current_event = line[7:].strip()
+    tools_result = None
+    resources_result = None
+    # 直接在当前线程里完成 SSE 连接 + 请求 + 读结果：单次读写由 httpx 超时兜底，
+    # 整体最多等 _FETCH_TOOLS_DEADLINE 秒，不再另起线程 + 队列去等结果
+    deadline = time.monotonic() + _FETCH_TOOLS_DEADLINE
+    try:
+        with httpx.Client(timeout=_FETCH_TOOLS_TIMEOUT, limits=_MCP_HTTP_LIMITS) as http_client:
+            with http_client.stream('GET', f'{mcp_base}/sse') as sse:
+                endpoint_url = None
+                current_event = None
+                n = 0
+                for line in sse.iter_lines():
+                    n += 1
+                    m = _SSE_FIELD_RE.match(line)
+                    if m and m[1] == 'event':
+                        current_event = m[2]
+                        continue
+                    if m:
+                        data_str = m[2]
+                        if current_event == 'endpoint' and endpoint_url is None:
+                            endpoint_url = f'{mcp_base}{data_str}' if data_str.startswith('/') else f'{mcp_base}/{data_str}'
+                            # 先完成握手（initialize 必须先于其它请求）；
+                            # 复用同一个 Client，POST 共用 keep-alive 连接
+                            http_client.post(endpoint_url, json={'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
+                                'params': {'protocolVersion': '2024-11-05', 'capabilities': {},
+                                           'clientInfo': {'name': 'AISecLab', 'version': '1.0'}}})
+                            http_client.post(endpoint_url, json={'jsonrpc': '2.0', 'method': 'notifications/initialized'})
+                            # tools/list 与 resources/list 互不依赖，同时发出，两次往返重叠成一次
+                            pending = _MCP_POST_POOL.submit(
+                                http_client.post, endpoint_url,
+                                json={'jsonrpc': '2.0', 'id': 11, 'method': 'resources/list', 'params': {}})
+                            http_client.post(endpoint_url, json={'jsonrpc': '2.0', 'id': 10, 'method': 'tools/list', 'params': {}})
+                            pending.result()
                             continue
-                        if line.startswith('data: '):
-                            data_str = line[6:].strip()
-                            if current_event == 'endpoint' and endpoint_url is None:
-                                endpoint_url = f'{mcp_base}{data_str}' if data_str.startswith('/') else f'{mcp_base}/{data_str}'
-                                # 立即在同一个线程中发送请求（避免线程竞争）
-                                with httpx.Client(timeout=8.0) as pc:
-                                    pc.post(endpoint_url, json={'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
-                                        'params': {'protocolVersion': '2024-11-05', 'capabilities': {},
-                                                   'clientInfo': {'name': 'AISecLab', 'version': '1.0'}}})
-                                    pc.post(endpoint_url, json={'jsonrpc': '2.0', 'method': 'notifications/initialized'})
-                                    pc.post(endpoint_url, json={'jsonrpc': '2.0', 'id': 10, 'method': 'tools/list', 'params': {}})
-                                    pc.post(endpoint_url, json={'jsonrpc': '2.0', 'id': 11, 'method': 'resources/list', 'params': {}})
-                                continue
-                            if current_event == 'message' and endpoint_url:
-                                try:
-                                    msg = json.loads(data_str)
-                                    mid = msg.get('id')
-                                    if mid == 10 and 'result' in msg:
-                                        tools_result = msg['result'].get('tools', [])
-                                    elif mid == 11 and 'result' in msg:
-                                        resources_result = msg['result'].get('resources', [])
-                                except json.JSONDecodeError:
-                                    pass
-                                if tools_result is not None and resources_result is not None:
-                                    break
-                        if n > 80:
-                            break
-        except Exception:
-            pass
-        result_q.put({'tools': tools_result, 'resources': resources_result})
-
-    t = threading.Thread(target=_worker, daemon=True)
-    t.start()
-    t.join(timeout=10)  # 最多等 10 秒
-
-    if not result_q.empty():
-        data = result_q.get_nowait()
-        if data.get('tools') is not None:
-            return {'tools': data['tools'], 'resources': data.get('resources') or []}
+                        if current_event == 'message' and endpoint_url:
+                            try:
+                                msg = json.loads(data_str)
+                                mid = msg.get('id')
+                                if mid == 10 and 'result' in msg:
+                                    tools_result = msg['result'].get('tools', [])
+                                elif mid == 11 and 'result' in msg:
+                                    resources_result = msg['result'].get('resources', [])
+                            except json.JSONDecodeError:
+                                pass
+                            if tools_result is not None and resources_result is not None:
+                                break
+                    if n > 80 or time.monotonic() > deadline:
+                        break
+    except Exception:
+        # 连不上 / 超时都按“拉取失败”处理，由调用方回退到静态定义
+        pass
+
+    if tools_result is not None:
+        return {'tools': tools_result, 'resources': resources_result or []}
     return None
 
 
-def get_mcp_tools_and_resources(challenge_id: int) -> Dict[str, Any]:
+def _freeze_tools(data: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    工具/资源列表转成只读结构：外层 MappingProxyType，列表转 tuple。
+    静态定义和缓存的实时结果会被多个请求共享，只读后调用方无需防御性拷贝；
+    单个工具仍是普通 dict，方便直接交给 JsonResponse 序列化。
+    """
+    return MappingProxyType({
+        'tools': tuple(data.get('tools') or ()),
+        'resources': tuple(data.get('resources') or ()),
+    })
+
+
+# 各挑战的静态工具/资源定义（MCP Server 未运行时的回退数据），模块加载时构建一次
+_STATIC_CHALLENGE_TOOLS: Dict[int, Dict[str, Any]] = {
+    1: {
+        "tools": [
+            {"name": "get_user_info", "description": "获取用户信息", "parameters": {"type": "object", "properties": {"username": {"type": "string", "description": "用户名"}}}}
+        ],
+        "resources": [
+            {"uri": "notes://{user_id}", "name": "用户笔记", "description": "获取指定用户的笔记"},
+            {"uri": "internal://credentials", "name": "内部凭据（隐藏）", "description": "系统内部凭据"}
+        ]
+    },
+    2: {
+        "tools": [
+            {"name": "get_user_info", "description": "获取用户信息", "parameters": {}},
+            {"name": "get_company_data", "description": "根据指定类型获取公司数据", "parameters": {"type": "object", "properties": {"data_type": {"type": "string"}}}},
+            {"name": "search_company_database", "description": "在公司数据库中搜索信息", "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}}
+        ],
+        "resources": [
+            {"uri": "company://confidential", "name": "机密公司信息（隐藏）", "description": ""}
+        ]
+    },
+    3: {
+        "tools": [
+            {"name": "read_file", "description": "从公共目录读取文件", "parameters": {"type": "object", "properties": {"filename": {"type": "string"}}}},
+            {"name": "search_files", "description": "在公共目录中搜索文件", "parameters": {"type": "object", "properties": {"keyword": {"type": "string"}}}}
+        ],
+        "resources": []
+    },
+    4: {
+        "tools": [
+            {"name": "get_weather_forecast", "description": "获取指定城市的天气预报", "parameters": {"type": "object", "properties": {"city": {"type": "string"}}}},
+            {"name": "reset_challenge", "description": "重置挑战状态", "parameters": {}}
+        ],
+        "resources": []
+    },
+    5: {
+        "tools": [
+            {"name": "get_user_role", "description": "获取用户角色", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}},
+            {"name": "get_user_roles", "description": "获取用户角色（可能被遮蔽）", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}}
+        ],
+        "resources": []
+    },
+    6: {
+        "tools": [
+            {"name": "read_document", "description": "从系统读取文档", "parameters": {"type": "object", "properties": {"document_name": {"type": "string"}}}},
+            {"name": "read_upload", "description": "读取用户上传的文档", "parameters": {"type": "object", "properties": {"upload_name": {"type": "string"}}}},
+            {"name": "upload_and_process_document", "description": "上传并处理文档", "parameters": {"type": "object", "properties": {"document_name": {"type": "string"}, "content": {"type": "string"}}}},
+            {"name": "search_documents", "description": "搜索文档", "parameters": {"type": "object", "properties": {"keyword": {"type": "string"}}}}
+        ],
+        "resources": []
+    },
+    7: {
+        "tools": [
+            {"name": "check_email", "description": "检查邮件", "parameters": {"type": "object", "properties": {"folder": {"type": "string", "default": "inbox"}}}},
+            {"name": "send_email", "description": "发送邮件", "parameters": {"type": "object", "properties": {"to": {"type": "string"}, "subject": {"type": "string"}, "body": {"type": "string"}}}},
+            {"name": "check_service_status", "description": "检查服务状态", "parameters": {"type": "object", "properties": {"service_id": {"type": "string"}}}},
+            {"name": "view_system_logs", "description": "查看系统日志", "parameters": {"type": "object", "properties": {"log_type": {"type": "string", "default": "system"}}}}
+        ],
+        "resources": []
+    },
+    8: {
+        "tools": [
+            {"name": "execute_python_code", "description": "执行 Python 代码进行数据分析", "parameters": {"type": "object", "properties": {"code": {"type": "string"}}}},
+            {"name": "execute_shell_command", "description": "执行 shell 命令", "parameters": {"type": "object", "properties": {"command": {"type": "string"}}}},
+            {"name": "analyze_log_file", "description": "分析日志文件", "parameters": {"type": "object", "properties": {"log_path": {"type": "string"}}}}
+        ],
+        "resources": []
+    },
+    9: {
+        "tools": [
+            {"name": "ping_host", "description": "Ping 主机检查连接", "parameters": {"type": "object", "properties": {"host": {"type": "string"}, "count": {"type": "integer", "default": 4}}}},
+            {"name": "traceroute", "description": "跟踪网络路由", "parameters": {"type": "object", "properties": {"host": {"type": "string"}}}},
+            {"name": "port_scan", "description": "检查端口是否开放", "parameters": {"type": "object", "properties": {"host": {"type": "string"}, "port": {"type": "integer"}}}},
+            {"name": "network_diagnostic", "description": "运行网络诊断", "parameters": {"type": "object", "properties": {"target": {"type": "string"}, "options": {"type": "string", "default": ""}}}},
+            {"name": "view_network_logs", "description": "查看网络日志", "parameters": {"type": "object", "properties": {"log_type": {"type": "string", "default": "ping"}}}}
+        ],
+        "resources": []
+    },
+    10: {
+        "tools": [
+            {"name": "authenticate", "description": "用户认证", "parameters": {"type": "object", "properties": {"username": {"type": "string"}, "password": {"type": "string"}}}},
+            {"name": "get_user_profile", "description": "获取用户配置文件", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}},
+            {"name": "run_system_diagnostic", "description": "运行系统诊断", "parameters": {"type": "object", "properties": {"component": {"type": "string", "default": "all"}}}},
+            {"name": "check_system_status", "description": "检查系统状态", "parameters": {}},
+            {"name": "analyze_log_file", "description": "分析日志文件", "parameters": {"type": "object", "properties": {"file_path": {"type": "string"}}}}
+        ],
+        "resources": []
+    }
+}
+
+_STATIC_CHALLENGE_TOOLS = MappingProxyType({cid: _freeze_tools(data) for cid, data in _STATIC_CHALLENGE_TOOLS.items()})
+
+_EMPTY_TOOLS = _freeze_tools({})
+
+
+def get_mcp_tools_and_resources(challenge_id: int) -> Mapping[str, Any]:
     """
     获取指定挑战的工具和资源列表。
     优先从 MCP Server 实时拉取（能看到完整的工具描述，包括隐藏指令）；
-    失败时回退到静态定义。
+    失败时回退到静态定义。返回只读结构（tools/resources 为 tuple），不要原地修改。
     """
     port = 9000 + challenge_id
 
+    # 工具定义基本不变，实时结果缓存 TOOLS_CACHE_TTL 秒，避免每次请求都重走一遍 SSE 握手
+    with _TOOLS_CACHE_LOCK:
+        cached = _TOOLS_CACHE.get(challenge_id)
+    if cached and time.monotonic() - cached[0] < TOOLS_CACHE_TTL:
+        return cached[1]
+
     # 尝试实时获取
     live_data = _fetch_tools_via_sse(port)
     if live_data and live_data.get('tools'):
+        live_data = _freeze_tools(live_data)
+        with _TOOLS_CACHE_LOCK:
+            _TOOLS_CACHE[challenge_id] = (time.monotonic(), live_data)
         return live_data
 
     # 回退：静态定义（MCP Server 未运行时使用）
-    base_url = f"http://{_get_dvmcp_host()}:{port}"
-    challenge_tools = {
-        1: {
-            "tools": [
-                {"name": "get_user_info", "description": "获取用户信息", "parameters": {"type": "object", "properties": {"username": {"type": "string", "description": "用户名"}}}}
-            ],
-            "resources": [
-                {"uri": "notes://{user_id}", "name": "用户笔记", "description": "获取指定用户的笔记"},
-                {"uri": "internal://credentials", "name": "内部凭据（隐藏）", "description": "系统内部凭据"}
-            ]
-        },
-        2: {
-            "tools": [
-                {"name": "get_user_info", "description": "获取用户信息", "parameters": {}},
-                {"name": "get_company_data", "description": "根据指定类型获取公司数据", "parameters": {"type": "object", "properties": {"data_type": {"type": "string"}}}},
-                {"name": "search_company_database", "description": "在公司数据库中搜索信息", "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}}
-            ],
-            "resources": [
-                {"uri": "company://confidential", "name": "机密公司信息（隐藏）", "description": ""}
-            ]
-        },
-        3: {
-            "tools": [
-                {"name": "read_file", "description": "从公共目录读取文件", "parameters": {"type": "object", "properties": {"filename": {"type": "string"}}}},
-                {"name": "search_files", "description": "在公共目录中搜索文件", "parameters": {"type": "object", "properties": {"keyword": {"type": "string"}}}}
-            ],
-            "resources": []
-        },
-        4: {
-            "tools": [
-                {"name": "get_weather_forecast", "description": "获取指定城市的天气预报", "parameters": {"type": "object", "properties": {"city": {"type": "string"}}}},
-                {"name": "reset_challenge", "description": "重置挑战状态", "parameters": {}}
-            ],
-            "resources": []
-        },
-        5: {
-            "tools": [
-                {"name": "get_user_role", "description": "获取用户角色", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}},
-                {"name": "get_user_roles", "description": "获取用户角色（可能被遮蔽）", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}}
-            ],
-            "resources": []
-        },
-        6: {
-            "tools": [
-                {"name": "read_document", "description": "从系统读取文档", "parameters": {"type": "object", "properties": {"document_name": {"type": "string"}}}},
-                {"name": "read_upload", "description": "读取用户上传的文档", "parameters": {"type": "object", "properties": {"upload_name": {"type": "string"}}}},
-                {"name": "upload_and_process_document", "description": "上传并处理文档", "parameters": {"type": "object", "properties": {"document_name": {"type": "string"}, "content": {"type": "string"}}}},
-                {"name": "search_documents", "description": "搜索文档", "parameters": {"type": "object", "properties": {"keyword": {"type": "string"}}}}
-            ],
-            "resources": []
-        },
-        7: {
-            "tools": [
-                {"name": "check_email", "description": "检查邮件", "parameters": {"type": "object", "properties": {"folder": {"type": "string", "default": "inbox"}}}},
-                {"name": "send_email", "description": "发送邮件", "parameters": {"type": "object", "properties": {"to": {"type": "string"}, "subject": {"type": "string"}, "body": {"type": "string"}}}},
-                {"name": "check_service_status", "description": "检查服务状态", "parameters": {"type": "object", "properties": {"service_id": {"type": "string"}}}},
-                {"name": "view_system_logs", "description": "查看系统日志", "parameters": {"type": "object", "properties": {"log_type": {"type": "string", "default": "system"}}}}
-            ],
-            "resources": []
-        },
-        8: {
-            "tools": [
-                {"name": "execute_python_code", "description": "执行 Python 代码进行数据分析", "parameters": {"type": "object", "properties": {"code": {"type": "string"}}}},
-                {"name": "execute_shell_command", "description": "执行 shell 命令", "parameters": {"type": "object", "properties": {"command": {"type": "string"}}}},
-                {"name": "analyze_log_file", "description": "分析日志文件", "parameters": {"type": "object", "properties": {"log_path": {"type": "string"}}}}
-            ],
-            "resources": []
-        },
-        9: {
-            "tools": [
-                {"name": "ping_host", "description": "Ping 主机检查连接", "parameters": {"type": "object", "properties": {"host": {"type": "string"}, "count": {"type": "integer", "default": 4}}}},
-                {"name": "traceroute", "description": "跟踪网络路由", "parameters": {"type": "object", "properties": {"host": {"type": "string"}}}},
-                {"name": "port_scan", "description": "检查端口是否开放", "parameters": {"type": "object", "properties": {"host": {"type": "string"}, "port": {"type": "integer"}}}},
-                {"name": "network_diagnostic", "description": "运行网络诊断", "parameters": {"type": "object", "properties": {"target": {"type": "string"}, "options": {"type": "string", "default": ""}}}},
-                {"name": "view_network_logs", "description": "查看网络日志", "parameters": {"type": "object", "properties": {"log_type": {"type": "string", "default": "ping"}}}}
-            ],
-            "resources": []
-        },
-        10: {
-            "tools": [
-                {"name": "authenticate", "description": "用户认证", "parameters": {"type": "object", "properties": {"username": {"type": "string"}, "password": {"type": "string"}}}},
-                {"name": "get_user_profile", "description": "获取用户配置文件", "parameters": {"type": "object", "properties": {"username": {"type": "string"}}}},
-                {"name": "run_system_diagnostic", "description": "运行系统诊断", "parameters": {"type": "object", "properties": {"component": {"type": "string", "default": "all"}}}},
-                {"name": "check_system_status", "description": "检查系统状态", "parameters": {}},
-                {"name": "analyze_log_file", "description": "分析日志文件", "parameters": {"type": "object", "properties": {"file_path": {"type": "string"}}}}
-            ],
-            "resources": []
-        }
-    }
-    
-    return challenge_tools.get(challenge_id, {"tools": [], "resources": []})
+    return _STATIC_CHALLENGE_TOOLS.get(challenge_id, _EMPTY_TOOLS)
 
 
 def call_mcp_tool(challenge_id: int, tool_name: str, arguments: Dict = None) -> Dict[str, Any]:
@@ -356,15 +404,53 @@ def call_mcp_tool(challenge_id: int, tool_name: str, arguments: Dict = None) ->
     }
 
 
-def check_mcp_server_running(challenge_id: int) -> bool:
-    """检查 MCP 服务器是否运行"""
+# 端口探测结果进程内缓存：challenge_id -> (探测时刻, 是否在运行)
+SERVER_STATUS_TTL = 5.0
+_SERVER_STATUS: Dict[int, tuple] = {}
+_SERVER_STATUS_LOCK = threading.Lock()
+
+
+def _probe_port(host: str, port: int) -> bool:
+    """TCP 连一下端口，能连上就认为服务在运行"""
     import socket
-    port = 9000 + challenge_id
+    # 本机端口没开会立刻被拒绝，不需要等满 1 秒；Docker 里走服务名稍微放宽
+    timeout = 0.2 if host == 'localhost' else 0.5
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        result = sock.connect_ex(('localhost', port))
-        sock.close()
-        return result == 0
-    except Exception:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
         return False
+
+
+def check_mcp_servers_running(challenge_ids: Iterable[int]) -> Dict[int, bool]:
+    """
+    批量检查多个挑战的 MCP 服务器是否运行。
+    结果缓存 SERVER_STATUS_TTL 秒；未命中缓存的端口并发探测，N 个端口只等一次超时。
+    """
+    now = time.monotonic()
+    status: Dict[int, bool] = {}
+    missing: List[int] = []
+    with _SERVER_STATUS_LOCK:
+        for cid in challenge_ids:
+            cached = _SERVER_STATUS.get(cid)
+            if cached and now - cached[0] < SERVER_STATUS_TTL:
+                status[cid] = cached[1]
+            else:
+                missing.append(cid)
+
+    if missing:
+        host = _get_dvmcp_host()
+        ports = [9000 + cid for cid in missing]
+        with ThreadPoolExecutor(max_workers=min(16, len(missing))) as pool:
+            results = list(pool.map(_probe_port, [host] * len(ports), ports))
+        now = time.monotonic()
+        with _SERVER_STATUS_LOCK:
+            for cid, running in zip(missing, results):
+                _SERVER_STATUS[cid] = (now, running)
+                status[cid] = running
+    return status
+
+
+def check_mcp_server_running(challenge_id: int) -> bool:
+    """检查 MCP 服务器是否运行"""
+    return check_mcp_servers_running([challenge_id])[challenge_id]
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import List, Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LabItem:
     """
     左侧侧栏的“二级项”。
@@ -19,7 +19,7 @@ class LabItem:
     url: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LabGroup:
     """
     左侧侧栏的“一级分类”。
@@ -0,0 +1,17 @@
+"""
+LLMConfig 变更时让 Agent 的配置缓存失效。
+
+MemoryAgent / ToolAgent 把 LLMConfig 缓存在进程内（每条聊天消息都会新建 Agent），
+配置页或后台保存、删除配置后，下一个 Agent 会重新从数据库读取。
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .agent import invalidate_config_cache
+from .models import LLMConfig
+
+
+@receiver(post_save, sender=LLMConfig)
+@receiver(post_delete, sender=LLMConfig)
+def reset_agent_config(**kwargs) -> None:
+    invalidate_config_cache()
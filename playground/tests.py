@@ -5,7 +5,8 @@
 """
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 
@@ -160,6 +161,63 @@ class LabPageResponseTest(TestCase):
         resp = self.client.get(reverse('playground:dvmcp_index'))
         self.assertEqual(resp.status_code, 200)
 
+    def test_dvmcp_challenge_page(self):
+        resp = self.client.get(reverse('playground:dvmcp_challenge', args=[2]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['prev_challenge'].id, 1)
+        resp = self.client.get(reverse('playground:dvmcp_challenge', args=[99]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_principles_are_read_only(self):
+        from dataclasses import FrozenInstanceError
+
+        from django.utils.safestring import SafeString, mark_safe
+
+        from .lab_principles import get_principle
+
+        principle = get_principle('dvmcp')
+        self.assertIsInstance(principle.sections, tuple)
+        with self.assertRaises(FrozenInstanceError):
+            principle.title = 'x'
+
+        # 静态 HTML 构建时已标记安全，模板的 |safe 不会再复制一遍
+        self.assertIsInstance(principle.sections[0].content, SafeString)
+        self.assertIs(mark_safe(principle.attack_flow), principle.attack_flow)
+
+    def test_principle_html_indentation_compacted(self):
+        from .lab_principles import _compact_html, get_principle
+
+        html = "<ul>\n    <li>a</li>\n</ul>\n<pre><code>def f():\n    return 1</code></pre>\n  <p>b</p>"
+        self.assertEqual(
+            _compact_html(html),
+            "<ul>\n<li>a</li>\n</ul>\n<pre><code>def f():\n    return 1</code></pre>\n<p>b</p>",
+        )
+        principle = get_principle('memory_poisoning')
+        self.assertNotIn('\n    <li>', principle.sections[0].content)
+
+    def test_principle_reference_links(self):
+        from django.template.loader import render_to_string
+
+        from .lab_principles import get_principle
+
+        principle = get_principle('memory_poisoning')
+        self.assertIn(
+            ('https://arxiv.org/abs/2403.06520', 'Memory Poisoning Attacks on LLM Agents'),
+            principle.reference_links,
+        )
+        html = render_to_string('playground/_principle_panel.html', {'principle': principle})
+        self.assertIn('href="https://arxiv.org/abs/2403.06520"', html)
+        self.assertNotIn('href="https://arxiv.org/abs/2403.06520 -', html)
+
+    def test_principle_aliases_share_instance(self):
+        from .lab_principles import _ALIAS, _CANONICAL, get_principle
+
+        self.assertIs(get_principle('tool_sqli'), get_principle('tool_security'))
+        self.assertIs(get_principle('dvmcp'), get_principle('dvmcp_overview'))
+        self.assertIsNone(get_principle('no_such_lab'))
+        # 别名只能指向已登记的原理
+        self.assertLessEqual(set(_ALIAS.values()), set(_CANONICAL))
+
     # ---- 多模态 ----
 
     def test_multimodal_lab_page(self):
@@ -183,6 +241,7 @@ class LLMApiMockTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.client.login(username='testuser', password='testpass123')
 
@@ -244,6 +303,128 @@ class LLMApiMockTest(TestCase):
         data = resp.json()
         self.assertTrue(data['success'])
 
+    @patch('playground.agent._HTTP.post')
+    def test_agent_uses_shared_session(self, mock_post):
+        from .agent import MemoryAgent
+
+        mock_resp = MagicMock()
+        mock_resp.json.return_value = {'choices': [{'message': {'content': 'ok'}}]}
+        mock_post.return_value = mock_resp
+
+        self.assertEqual(MemoryAgent(memory=[]).run('hi'), 'ok')
+        cfg = LLMConfig.objects.get(pk=1)
+        cfg.api_key = 'new-key'
+        cfg.save()
+        MemoryAgent(memory=[]).run('hi')
+        # 复用同一个会话，但每次请求带上当前配置的 API Key
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_post.call_args.kwargs['headers']['Authorization'], 'Bearer new-key')
+
+    def test_memory_agent_static_prefix(self):
+        from .agent import MemoryAgent
+
+        memory = [
+            {'type': 'conversation', 'content': '对话记录'},
+            {'type': 'finetune_rule', 'content': '训练期规则'},
+        ]
+        plain = MemoryAgent(memory=memory).build_messages('hi')
+        with_preamble = MemoryAgent(memory=memory, system_preamble='场景说明').build_messages('hello')
+        # 场景说明放在基础系统提示前面，合成一条 system 消息；记忆块和用户输入在后
+        self.assertEqual(len(with_preamble), 3)
+        self.assertEqual(with_preamble[0]['content'], '场景说明\n\n' + plain[0]['content'])
+        self.assertEqual(plain[-2], with_preamble[-2])
+        self.assertLess(plain[1]['content'].index('训练期规则'), plain[1]['content'].index('对话记录'))
+
+        # 同优先级保持原有先后顺序；排序不往调用方的记忆 dict 里写额外字段
+        stable = MemoryAgent(memory=[{'type': 'poison', 'content': '甲'}, {'type': 'user_rule', 'content': '乙'}])
+        self.assertTrue(stable.build_messages('hi')[-2]['content'].endswith('甲\n乙'))
+        self.assertEqual(memory[0], {'type': 'conversation', 'content': '对话记录'})
+
+        dup = MemoryAgent(memory=memory + [{'type': 'poison', 'content': '训练期规则 '}]).build_messages('hi')
+        self.assertEqual(dup[-2], plain[-2])
+        self.assertEqual(plain[-1], {'role': 'user', 'content': 'hi'})
+
+    def test_agent_memory_block_cached(self):
+        from .agent import ToolAgent
+
+        agent = ToolAgent(memory=[{'content': '旧记忆'}])
+        first = agent.build_messages('a')[1]['content']
+        self.assertIs(agent.build_messages('b')[1]['content'], first)
+
+        # 空内容跳过，首尾空白去掉后再去重
+        agent = ToolAgent(memory=[{'content': ' 新记忆 '}, {'content': ''}, {'content': '新记忆'}])
+        self.assertTrue(agent.build_messages('d')[1]['content'].endswith('】\n新记忆'))
+        agent = ToolAgent(memory=[{'content': '  '}])
+        self.assertIn('当前还没有任何长期记忆', agent.build_messages('e')[1]['content'])
+
+    def test_agent_async_stream(self):
+        from functools import partial
+
+        import httpx
+        from asgiref.sync import async_to_sync
+
+        from .agent import MemoryAgent
+
+        body = (
+            'data: {"choices": [{"delta": {"content": "你"}}]}\n\n'
+            ': keep-alive\n\n'
+            'data: {"choices": [{"delta": {}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": "好"}}]}\n\n'
+            'data: [DONE]\n\n'
+            'data: {"choices": [{"delta": {"content": "x"}}]}\n\n'
+        )
+        raw = body.encode('utf-8')
+        # 分块边界落在 “你” 的 UTF-8 字节中间和一行的中间，按字节切行后才解码也不会乱码
+        cut = raw.index('你'.encode('utf-8')) + 1
+        chunks = [raw[:cut], raw[cut:cut + 40], raw[cut + 40:]]
+
+        async def stream():
+            for c in chunks:
+                yield c
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=stream()))
+        agent = MemoryAgent(memory=[])
+
+        async def collect():
+            return [c async for c in agent.acall_llm_stream([{'role': 'user', 'content': 'hi'}])]
+
+        with patch('playground.agent.httpx.AsyncClient', partial(httpx.AsyncClient, transport=transport)):
+            self.assertEqual(async_to_sync(collect)(), ['你', '好'])
+
+    @patch('playground.agent._HTTP.post')
+    def test_agent_reply_cache(self, mock_post):
+        from .agent import MemoryAgent
+
+        mock_resp = MagicMock()
+        mock_resp.json.return_value = {'choices': [{'message': {'content': 'ok'}}]}
+        mock_post.return_value = mock_resp
+
+        memory = [{'type': 'user_memory', 'content': '记忆'}]
+        # 默认不缓存
+        MemoryAgent(memory=memory).run('同一个问题')
+        MemoryAgent(memory=memory).run('同一个问题')
+        self.assertEqual(mock_post.call_count, 2)
+
+        self.assertEqual(MemoryAgent(memory=memory, use_cache=True).run('同一个问题'), 'ok')
+        self.assertEqual(MemoryAgent(memory=memory, use_cache=True).run('同一个问题'), 'ok')
+        self.assertEqual(mock_post.call_count, 3)
+        # 记忆变化、温度不为 0 都不命中缓存
+        MemoryAgent(memory=[], use_cache=True).run('同一个问题')
+        MemoryAgent(memory=memory, temperature=0.7, use_cache=True).run('同一个问题')
+        MemoryAgent(memory=memory, temperature=0.7, use_cache=True).run('同一个问题')
+        self.assertEqual(mock_post.call_count, 6)
+
+    def test_agent_config_cached_until_saved(self):
+        from .agent import MemoryAgent, ToolAgent
+
+        MemoryAgent(memory=[])
+        with self.assertNumQueries(0):
+            ToolAgent(memory=[])
+        cfg = LLMConfig.objects.get(pk=1)
+        cfg.default_model = 'new-model'
+        cfg.save()
+        self.assertEqual(MemoryAgent(memory=[]).model, 'new-model')
+
     def test_api_without_config(self):
         """未配置 LLM 时 API 应该返回错误而非 500"""
         LLMConfig.objects.all().delete()
@@ -275,3 +456,313 @@ class CsrfProtectionTest(TestCase):
             content_type='application/json',
         )
         self.assertEqual(resp.status_code, 403)
+
+
+class AdminChangelistQueryTest(TestCase):
+    """测试后台列表页外键一次 JOIN 取出，不随行数增加查询"""
+
+    def test_attempt_changelist_query_count_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .models import Attempt, Challenge
+
+        admin_user = User.objects.create_superuser(username='admin', password='testpass123')
+        client = Client()
+        client.login(username='admin', password='testpass123')
+        url = reverse('admin:playground_attempt_changelist')
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(client.get(url).status_code, 200)
+            return len(ctx.captured_queries)
+
+        challenge = Challenge.objects.create(title='c0', description='d', flag='f')
+        Attempt.objects.create(user=admin_user, challenge=challenge, submitted_flag='x')
+        baseline = count_queries()
+        for i in range(5):
+            user = User.objects.create_user(username=f'u{i}', password='p')
+            challenge = Challenge.objects.create(title=f'c{i + 1}', description='d', flag='f')
+            Attempt.objects.create(user=user, challenge=challenge, submitted_flag='x')
+        self.assertEqual(count_queries(), baseline)
+
+
+class InitialDataTest(TestCase):
+    """测试启动时自动补齐演示题目"""
+
+    def test_seeded_after_migrate(self):
+        from .models import Challenge
+
+        self.assertEqual(Challenge.objects.filter(title__contains='XSS').count(), 1)
+
+    def test_ensure_initial_data_idempotent(self):
+        from .apps import _ensure_initial_data
+        from .models import Challenge
+
+        # 建测试库时 post_migrate 已经补过一遍，先清空
+        Challenge.objects.all().delete()
+        Challenge.objects.create(title='日志泄露检测', description='已存在', flag='f')
+        _ensure_initial_data()
+        _ensure_initial_data()
+        self.assertEqual(Challenge.objects.count(), 5)
+        self.assertEqual(Challenge.objects.get(title='日志泄露检测').description, '已存在')
+
+
+class DosConnectionCountTest(TestCase):
+    """测试 DoS 靶场连接计数"""
+
+    def test_concurrent_connect_disconnect(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from . import consumers
+
+        start = consumers.get_dos_connection_count()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: consumers._add_dos_connections(1), range(1000)))
+            list(pool.map(lambda _: consumers._add_dos_connections(-1), range(1000)))
+        self.assertEqual(consumers.get_dos_connection_count(), start)
+        consumers._add_dos_connections(-(start + 1))
+        self.assertEqual(consumers.get_dos_connection_count(), 0)
+
+
+class CswshConsumerTest(TransactionTestCase):
+    """测试 CSWSH 聊天流式推送（合并小块后发送）"""
+
+    def test_small_chunks_coalesced(self):
+        import json
+        from types import SimpleNamespace
+
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+
+        from . import consumers
+
+        class FakeAgent:
+            def __init__(self, memory):
+                pass
+
+            async def acall_llm_stream(self, messages):
+                for ch in '流' * 200:
+                    yield ch
+
+        async def chat():
+            communicator = WebsocketCommunicator(consumers.CswshChatConsumer.as_asgi(), '/ws/cswsh/')
+            communicator.scope['session'] = SimpleNamespace(session_key='testsession')
+            await communicator.connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'hi'}))
+            frames = []
+            while True:
+                frame = json.loads(await communicator.receive_from())
+                frames.append(frame)
+                if frame['type'] == 'done':
+                    break
+            await communicator.disconnect()
+            return frames
+
+        with patch.object(consumers, 'MemoryAgent', FakeAgent):
+            frames = async_to_sync(chat)()
+        chunks = [f['text'] for f in frames if f['type'] == 'chunk']
+        self.assertEqual(''.join(chunks), '流' * 200)
+        self.assertEqual(frames[-1]['text'], '流' * 200)
+        self.assertLessEqual(len(chunks), 200 // consumers.CHUNK_FLUSH_CHARS + 1)
+
+    def test_buffered_tail_flushed_while_upstream_stalls(self):
+        import asyncio
+        import json
+        from types import SimpleNamespace
+
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+
+        from . import consumers
+
+        release = asyncio.Event()
+
+        class FakeAgent:
+            def __init__(self, memory):
+                pass
+
+            async def acall_llm_stream(self, messages):
+                yield '前'
+                # 上游卡住，直到测试确认已经收到前面的内容
+                await release.wait()
+                yield '后'
+
+        async def chat():
+            communicator = WebsocketCommunicator(consumers.CswshChatConsumer.as_asgi(), '/ws/cswsh/')
+            communicator.scope['session'] = SimpleNamespace(session_key='testsession')
+            await communicator.connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'hi'}))
+            # 不足 CHUNK_FLUSH_CHARS 的尾巴在间隔到了之后就发出，不等下一块
+            first = json.loads(await communicator.receive_from(timeout=1))
+            release.set()
+            frames = [first]
+            while frames[-1]['type'] != 'done':
+                frames.append(json.loads(await communicator.receive_from()))
+            await communicator.disconnect()
+            return frames
+
+        with patch.object(consumers, 'MemoryAgent', FakeAgent):
+            frames = async_to_sync(chat)()
+        self.assertEqual(frames[0], {'type': 'chunk', 'text': '前'})
+        self.assertEqual(frames[-1], {'type': 'done', 'text': '前后'})
+
+
+class MCPSSEClientTest(TestCase):
+    """测试 DVMCP 的 MCP SSE 客户端（httpx.MockTransport 模拟服务端）"""
+
+    def _make_client(self, sse_body):
+        from functools import partial
+
+        import httpx
+
+        from .dvmcp_client import MCPSSEClient
+
+        self.requests = []
+        self.encodings = set()
+        chunks = [sse_body.encode()] if isinstance(sse_body, str) else sse_body
+
+        def handler(request):
+            self.requests.append((request.method, request.url.path))
+            self.encodings.add(request.headers.get('accept-encoding', ''))
+            if request.method == 'POST':
+                self.assertEqual(request.headers['content-type'], 'application/json')
+            if request.url.path == '/sse':
+                return httpx.Response(200, content=iter(chunks), headers={'content-type': 'text/event-stream'})
+            return httpx.Response(200, json={'jsonrpc': '2.0', 'id': 1, 'result': {'tools': [{'name': 't'}]}})
+
+        # 用 MCPSSEClient 自己建的 Client（同样的超时、连接池、默认请求头），只把传输层换成 mock
+        with patch('httpx.Client', partial(httpx.Client, transport=httpx.MockTransport(handler))):
+            client = MCPSSEClient('http://mcp.test')
+        self.addCleanup(client.close)
+        return client
+
+    def test_requests_share_one_client(self):
+        client = self._make_client('event: endpoint\ndata: /messages/?session_id=abc\n\n')
+        self.assertEqual(client.list_tools(), [{'name': 't'}])
+        self.assertEqual(client.list_tools(), [{'name': 't'}])
+        self.assertEqual(client.session_id, 'abc')
+        # SSE 握手和两次 JSON-RPC 请求都走同一个 Client
+        self.assertEqual(self.requests, [('GET', '/sse'), ('POST', '/messages/'), ('POST', '/messages/')])
+        # SSE 和 JSON-RPC 请求都声明接受 gzip（httpx 默认带上并自动解压），大的 tools/list 响应可以压缩传输
+        self.assertEqual(len(self.encodings), 1)
+        self.assertIn('gzip', self.encodings.pop())
+
+    def test_connect_parses_endpoint_split_across_chunks(self):
+        body = ': keep-alive\r\nevent: endp'.encode(), b'oint\r\ndata: /messages/?session_id=x', b'y&v=1\r\n\r\n'
+        client = self._make_client(list(body))
+        self.assertTrue(client.connect())
+        self.assertEqual(client.session_id, 'xy')
+        self.assertEqual(client.message_url, 'http://mcp.test/messages/?session_id=xy&v=1')
+
+    def test_connect_skips_events_before_endpoint(self):
+        client = self._make_client('event: ping\ndata: 1\n\nevent: endpoint\ndata: /messages/?v=1&session_id=a%2Bb\n\n')
+        self.assertTrue(client.connect())
+        self.assertEqual(client.session_id, 'a+b')
+        self.assertEqual(client.message_url, 'http://mcp.test/messages/?v=1&session_id=a%2Bb')
+
+    def test_connect_gives_up_after_deadline(self):
+        client = self._make_client('event: ping\ndata: 1\n\nevent: endpoint\ndata: /messages/?session_id=abc\n\n')
+        with patch('playground.dvmcp_client.time.monotonic', side_effect=[0.0, 10.0]):
+            self.assertFalse(client.connect())
+        self.assertIsNone(client.message_url)
+
+    def test_fetch_tools_via_sse(self):
+        import json
+        import threading
+        from functools import partial
+
+        import httpx
+
+        from .dvmcp_client import _fetch_tools_via_sse
+
+        posted = []
+        both_listed = threading.Event()
+
+        def sse_events():
+            yield b'event: endpoint\ndata: /messages/?session_id=abc\n\n'
+            both_listed.wait(5)
+            yield b'event: message\ndata: {"jsonrpc": "2.0", "id": 11, "result": {"resources": [{"uri": "r://1"}]}}\n\n'
+            yield b'event: message\ndata: {"jsonrpc": "2.0", "id": 10, "result": {"tools": [{"name": "t"}]}}\n\n'
+
+        def handler(request):
+            if request.url.path == '/sse':
+                return httpx.Response(200, content=sse_events(), headers={'content-type': 'text/event-stream'})
+            posted.append(json.loads(request.content)['method'])
+            if {'tools/list', 'resources/list'} <= set(posted):
+                both_listed.set()
+            return httpx.Response(202, text='Accepted')
+
+        with patch('httpx.Client', partial(httpx.Client, transport=httpx.MockTransport(handler))):
+            data = _fetch_tools_via_sse(9001)
+        self.assertEqual(data, {'tools': [{'name': 't'}], 'resources': [{'uri': 'r://1'}]})
+        # 先握手，再发两个互不依赖的列表请求
+        self.assertEqual(posted[:2], ['initialize', 'notifications/initialized'])
+        self.assertEqual(sorted(posted[2:]), ['resources/list', 'tools/list'])
+
+    def test_live_tools_cached_per_challenge(self):
+        from . import dvmcp_client
+
+        dvmcp_client._TOOLS_CACHE.clear()
+        self.addCleanup(dvmcp_client._TOOLS_CACHE.clear)
+        live = {'tools': [{'name': 'live'}], 'resources': []}
+        with patch.object(dvmcp_client, '_fetch_tools_via_sse', return_value=live) as fetch:
+            first = dvmcp_client.get_mcp_tools_and_resources(1)
+            self.assertEqual(first, {'tools': ({'name': 'live'},), 'resources': ()})
+            self.assertIs(dvmcp_client.get_mcp_tools_and_resources(1), first)
+            with self.assertRaises(TypeError):
+                first['tools'] = []
+            self.assertEqual(fetch.call_count, 1)
+            dvmcp_client.get_mcp_tools_and_resources(2)
+            self.assertEqual(fetch.call_count, 2)
+            # 过了 TTL 才重新拉取
+            with patch.object(dvmcp_client.time, 'monotonic', return_value=dvmcp_client.time.monotonic() + 60):
+                dvmcp_client.get_mcp_tools_and_resources(1)
+            self.assertEqual(fetch.call_count, 3)
+
+        # 拉取失败时回退到静态定义，且不缓存，MCP Server 启动后立刻能拿到实时数据
+        dvmcp_client._TOOLS_CACHE.clear()
+        with patch.object(dvmcp_client, '_fetch_tools_via_sse', return_value=None) as fetch:
+            static = dvmcp_client.get_mcp_tools_and_resources(1)
+            self.assertIs(dvmcp_client.get_mcp_tools_and_resources(1), static)
+            self.assertEqual(fetch.call_count, 2)
+            self.assertEqual(static['tools'][0]['name'], 'get_user_info')
+            self.assertEqual(dvmcp_client.get_mcp_tools_and_resources(99), {'tools': (), 'resources': ()})
+
+    def test_fetch_tools_unreachable_server(self):
+        from functools import partial
+
+        import httpx
+
+        from .dvmcp_client import _fetch_tools_via_sse
+
+        def handler(request):
+            raise httpx.ConnectError('connection refused', request=request)
+
+        with patch('httpx.Client', partial(httpx.Client, transport=httpx.MockTransport(handler))):
+            self.assertIsNone(_fetch_tools_via_sse(9001))
+
+    def test_server_status_probed_in_batch_and_cached(self):
+        from . import dvmcp_client
+
+        with dvmcp_client._SERVER_STATUS_LOCK:
+            dvmcp_client._SERVER_STATUS.clear()
+        with patch.object(dvmcp_client, '_probe_port', side_effect=lambda host, port: port == 9002) as probe:
+            self.assertEqual(dvmcp_client.check_mcp_servers_running([1, 2, 3]), {1: False, 2: True, 3: False})
+            self.assertEqual(probe.call_count, 3)
+            # 缓存有效期内不再探测，只补测新出现的挑战
+            self.assertTrue(dvmcp_client.check_mcp_server_running(2))
+            self.assertEqual(dvmcp_client.check_mcp_servers_running([1, 4]), {1: False, 4: False})
+            self.assertEqual(probe.call_count, 4)
+
+    def test_tools_api_serializes_static_tools(self):
+        from . import dvmcp_client
+
+        with patch.object(dvmcp_client, '_fetch_tools_via_sse', return_value=None), \
+                patch.object(dvmcp_client, '_probe_port', return_value=False):
+            dvmcp_client._TOOLS_CACHE.clear()
+            resp = self.client.get(reverse('playground:dvmcp_tools_api'), {'challenge_id': 2})
+        data = resp.json()
+        self.assertTrue(data['success'])
+        self.assertEqual([t['name'] for t in data['tools']][0], 'get_user_info')
+        self.assertEqual(data['resources'][0]['uri'], 'company://confidential')
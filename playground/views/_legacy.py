@@ -641,7 +641,8 @@ def memory_chat_api(request: HttpRequest) -> JsonResponse:
     if trigger_return is not None:
         reply = trigger_return
     else:
-        agent = MemoryAgent(new_memory, override_model=None, system_preamble=system_preamble)
+        # 记忆投毒的各个 case 要求结果可复现：记忆、场景说明、问题完全相同时直接复用上次的回复
+        agent = MemoryAgent(new_memory, override_model=None, system_preamble=system_preamble, use_cache=True)
         reply = agent.run(user_input)
 
     # 自强化（Self-Reinforcing）：额外跑一轮“反思→写回长期记忆”
@@ -2382,19 +2383,7 @@ from ..dvmcp_challenges import (
     DIFFICULTY_LABELS,
     DIFFICULTY_COLORS
 )
-
-
-def _check_port_open(host: str, port: int, timeout: float = 0.5) -> bool:
-    '''检查端口是否开放'''
-    import socket
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
-        return result == 0
-    except Exception:
-        return False
+from ..dvmcp_client import check_mcp_server_running, check_mcp_servers_running
 
 
 def _get_dvmcp_host() -> str:
@@ -2412,11 +2401,8 @@ def dvmcp_index_page(request: HttpRequest) -> HttpResponse:
     '''DVMCP 靶场主页 - 展示所有 10 个挑战'''
     challenges = get_all_challenges()
     
-    # 检查 Docker 服务状态
-    docker_status = {}
-    dvmcp_host = _get_dvmcp_host()
-    for c in challenges:
-        docker_status[c.id] = _check_port_open(dvmcp_host, c.port)
+    # 检查 Docker 服务状态（各端口并发探测，短时间内的重复访问直接用缓存）
+    docker_status = check_mcp_servers_running(c.id for c in challenges)
     
     # 按难度分组
     easy_challenges = get_challenges_by_difficulty('easy')
@@ -2474,7 +2460,7 @@ def dvmcp_challenge_page(request: HttpRequest, challenge_id: int) -> HttpRespons
         raise Http404('挑战不存在')
     
     # 检查服务状态
-    is_running = _check_port_open(_get_dvmcp_host(), challenge.port)
+    is_running = check_mcp_server_running(challenge.id)
     
     # 获取用户进度
     lab_slug = f'dvmcp:{challenge.id}'
@@ -2511,11 +2497,11 @@ def dvmcp_challenge_page(request: HttpRequest, challenge_id: int) -> HttpRespons
 def dvmcp_status_api(request: HttpRequest) -> JsonResponse:
     '''获取所有 DVMCP 挑战服务的运行状态'''
     challenges = get_all_challenges()
-    dvmcp_host = _get_dvmcp_host()
+    running = check_mcp_servers_running(c.id for c in challenges)
     status = {}
     for c in challenges:
         status[c.id] = {
-            'running': _check_port_open(dvmcp_host, c.port),
+            'running': running[c.id],
             'port': c.port,
             'title': c.title,
         }
@@ -2872,7 +2858,7 @@ def dvmcp_chat_api(request: HttpRequest) -> JsonResponse:
 
 def dvmcp_tools_api(request: HttpRequest) -> JsonResponse:
     '''获取指定挑战的可用工具和资源'''
-    from ..dvmcp_client import get_mcp_tools_and_resources, check_mcp_server_running
+    from ..dvmcp_client import get_mcp_tools_and_resources
     
     challenge_id = request.GET.get('challenge_id')
     if not challenge_id:
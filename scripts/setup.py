@@ -124,21 +124,12 @@ def create_superuser():
     """创建管理员账号"""
     print_step("5/5", "创建管理员账号")
     
-    # 检查是否已存在 admin 用户
-    check_cmd = f'{sys.executable} -c "import django; django.setup(); from django.contrib.auth.models import User; print(User.objects.filter(username=\'admin\').exists())"'
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aisec_playground.settings')
-    
-    try:
-        result = run_command(check_cmd, capture=True)
-        if 'True' in result.stdout:
-            print_success("管理员账号已存在 (admin/admin)")
-            return
-    except:
-        pass
-    
-    print("创建管理员账号...")
-    run_command(f"{sys.executable} create_superuser.py")
-    print_success("管理员账号已创建 (admin/admin)")
+    # create_superuser.py 自身会判断 admin 是否已存在，只需启动一次 Django
+    result = run_command(f"{sys.executable} create_superuser.py", capture=True)
+    if 'already exists' in result.stdout:
+        print_success("管理员账号已存在 (admin/admin)")
+    else:
+        print_success("管理员账号已创建 (admin/admin)")
 
 def print_summary():
     """打印安装完成信息"""